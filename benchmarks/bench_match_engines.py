@@ -0,0 +1,108 @@
+"""Compare the sparse TF-IDF and LSA match engines on a synthetic knowledge base.
+
+Run from the repository root (NLTK's stopwords must be downloaded)::
+
+    python -m benchmarks.bench_match_engines --answers 2000 --components 128
+
+Each answer gets a small topic vocabulary and trigger phrases drawn from it.
+Queries reuse an answer's topic words in combinations no trigger phrase
+lists, the case LSA's smoothing is meant to help.
+"""
+
+import argparse
+import dataclasses
+import random
+import time
+
+from src.utils.nlp_index import lsa_projection, normalize_rows
+from src.utils.nlp_processor import NLPProcessor
+
+
+def knowledge_base(answers, phrases_per_answer, seed=0):
+    rng = random.Random(seed)
+    words = [f"w{i}" for i in range(answers * 3)]
+    topics = [rng.sample(words, 10) for _ in range(answers)]
+    rows = [
+        (
+            ", ".join(
+                " ".join(rng.sample(topic, 3)) for _ in range(phrases_per_answer)
+            ),
+            f"answer {answer}",
+        )
+        for answer, topic in enumerate(topics)
+    ]
+    return rows, topics
+
+
+def queries(topics, count, seed=1):
+    rng = random.Random(seed)
+    picked = rng.sample(range(len(topics)), min(count, len(topics)))
+    return [
+        (f"answer {answer}", " ".join(rng.sample(topics[answer], 3)))
+        for answer in picked
+    ]
+
+
+def with_lsa(index, components):
+    projection = lsa_projection(index.tfidf_matrix, components)
+    return dataclasses.replace(
+        index,
+        projection=projection,
+        embeddings=normalize_rows(index.tfidf_matrix @ projection),
+    )
+
+
+def measure(name, processor, index, cases, build_seconds):
+    processor.index = index
+    vectors = index.vectorizer.transform(
+        [processor.preprocess_text(text) for _, text in cases]
+    )
+
+    start = time.perf_counter()
+    for row in range(vectors.shape[0]):
+        index.top_k(vectors[row], 1)
+    single = (time.perf_counter() - start) / vectors.shape[0]
+
+    start = time.perf_counter()
+    matches = index.top_k_batch(vectors, 1)
+    batch = time.perf_counter() - start
+
+    hits = sum(
+        bool(found) and index.answer_for(found[0][0]) == expected
+        for (expected, _), found in zip(cases, matches)
+    )
+    print(
+        f"{name:>6}: build {build_seconds:6.2f}s, "
+        f"{index.memory_bytes() / 1e6:6.1f} MB, "
+        f"{single * 1e6:7.1f} us/query, "
+        f"batch of {len(cases)} {batch * 1e3:6.1f} ms, "
+        f"recall {hits / len(cases):.3f}"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--answers", type=int, default=2000)
+    parser.add_argument("--phrases-per-answer", type=int, default=4)
+    parser.add_argument("--queries", type=int, default=1000)
+    parser.add_argument("--components", type=int, default=128)
+    args = parser.parse_args()
+
+    rows, topics = knowledge_base(args.answers, args.phrases_per_answer)
+    cases = queries(topics, args.queries)
+    processor = NLPProcessor(source_spec=None, snapshot_dir="")
+
+    start = time.perf_counter()
+    sparse = processor.build_index(rows, 1)
+    sparse_seconds = time.perf_counter() - start
+    start = time.perf_counter()
+    lsa = with_lsa(sparse, args.components)
+    lsa_seconds = sparse_seconds + time.perf_counter() - start
+
+    print(f"{len(sparse)} trigger phrases, {len(sparse.answers)} answers")
+    measure("tfidf", processor, sparse, cases, sparse_seconds)
+    measure("lsa", processor, lsa, cases, lsa_seconds)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""Compare the regex tokenizer with NLTK's ``word_tokenize`` on chat messages.
+
+Run from the repository root, with NLTK's English Punkt model downloaded
+(``python -m nltk.downloader punkt_tab``)::
+
+    python -m benchmarks.bench_tokenizers --messages 20000
+"""
+
+import argparse
+import random
+import time
+
+import nltk
+from nltk.tokenize import word_tokenize
+
+from src.utils.tokenizers import regex_tokenize
+
+WORDS = (
+    "how do i verify my account reset password server rules ban appeal nitro "
+    "boost the a is to help please thanks can't it's i'm gonna mr. e.g. 3.5"
+).split()
+ENDINGS = ["", "", "", "", ",", ".", "?", "!", "...", ":", ")", "'"]
+
+
+def chat_messages(count, seed=0):
+    rng = random.Random(seed)
+    return [
+        " ".join(
+            rng.choice(WORDS) + rng.choice(ENDINGS) for _ in range(rng.randint(1, 20))
+        )
+        for _ in range(count)
+    ]
+
+
+def timed(tokenize, messages):
+    start = time.perf_counter()
+    tokens = [
+        [token for token in tokenize(message) if token.isalnum()]
+        for message in messages
+    ]
+    return time.perf_counter() - start, tokens
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--messages", type=int, default=20000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    try:
+        nltk.data.find("tokenizers/punkt_tab/english/")
+    except LookupError:
+        parser.exit(
+            1, "punkt_tab is not installed; run: python -m nltk.downloader punkt_tab\n"
+        )
+
+    messages = [message.lower() for message in chat_messages(args.messages, args.seed)]
+    nltk_seconds, expected = timed(word_tokenize, messages)
+    regex_seconds, actual = timed(regex_tokenize, messages)
+    mismatches = sum(a != b for a, b in zip(actual, expected))
+
+    print(f"{len(messages)} messages")
+    print(f"  nltk:  {nltk_seconds:.3f}s ({len(messages) / nltk_seconds:,.0f} msg/s)")
+    print(f"  regex: {regex_seconds:.3f}s ({len(messages) / regex_seconds:,.0f} msg/s)")
+    print(f"  speedup: {nltk_seconds / regex_seconds:.1f}x, mismatches: {mismatches}")
+
+
+if __name__ == "__main__":
+    main()
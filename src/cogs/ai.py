@@ -3,14 +3,90 @@ from discord.ext import commands
 import logging
 from typing import List, Dict
 import asyncio
+import time
 
-from src.utils.helpers import send_embed
+from src.utils.helpers import build_embed, send_embed
 from src.utils.ai_client import AIClient
-from src.config.settings import RATE_LIMIT_INTERVAL, RATE_LIMIT_MAX_REQUESTS
+from src.config.settings import (
+    ASK_CONTEXT_DOCUMENTS,
+    ASK_EDIT_INTERVAL,
+    ASK_STREAMING,
+    RATE_LIMIT_INTERVAL,
+    RATE_LIMIT_MAX_REQUESTS,
+)
 
 logger = logging.getLogger(__name__)
 
 
+class AnswerStream:
+    """Show a streamed answer in a single reply that is edited as it grows.
+
+    ``update`` only records the latest text. A task of the stream's own
+    posts the reply with the first text and then edits it at most once
+    every ``interval`` seconds, so long answers stay within Discord's edit
+    rate limits and a slow channel never holds up the answer itself.
+    """
+
+    CURSOR = " ▌"
+
+    def __init__(self, ctx, interval: float):
+        self.ctx = ctx
+        self.interval = interval
+        self.message = None
+        self.last_edit = 0.0
+        self.text = ""
+        self.changed = asyncio.Event()
+        self.finished = False
+        self.task = None
+
+    async def _show(self, embed):
+        self.last_edit = time.monotonic()
+        if self.message is None:
+            self.message = await self.ctx.message.reply(embed=embed)
+        else:
+            await self.message.edit(embed=embed)
+
+    def update(self, text: str):
+        self.text = text
+        self.changed.set()
+        if self.task is None:
+            self.task = asyncio.create_task(self._edit())
+
+    async def _edit(self):
+        while True:
+            await self.changed.wait()
+            if self.finished:
+                return
+            self.changed.clear()
+            embed = build_embed(
+                self.ctx,
+                "AI Answer",
+                self.text + self.CURSOR,
+                discord.Color.green(),
+                "🤖",
+            )
+            try:
+                await self._show(embed)
+            except discord.HTTPException as e:
+                logger.warning(f"Could not update streamed answer: {e}")
+            await asyncio.sleep(self.last_edit + self.interval - time.monotonic())
+
+    async def finish(self, title, text, color, emoji):
+        # Let an edit already under way land, so the reply is never posted
+        # twice, then replace it with the full answer.
+        self.finished = True
+        self.changed.set()
+        if self.task is not None:
+            await self.task
+        if self.message is not None:
+            await asyncio.sleep(self.last_edit + self.interval - time.monotonic())
+        await self._show(build_embed(self.ctx, title, text, color, emoji))
+
+    def cancel(self):
+        if self.task is not None:
+            self.task.cancel()
+
+
 class AI(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
@@ -21,6 +97,9 @@ class AI(commands.Cog):
             f"AI cog initialized with rate limits: {RATE_LIMIT_MAX_REQUESTS} requests every {RATE_LIMIT_INTERVAL} seconds"
         )
 
+    async def cog_unload(self):
+        await self.ai_client.close()
+
     @commands.Cog.listener()
     async def on_ready(self):
         logger.info("AI cog loaded")
@@ -65,9 +144,8 @@ class AI(commands.Cog):
             )
             return
 
-        knowledge_base = self._get_knowledge_base()
-
-        if not knowledge_base:
+        processor = await self.nlp_cog.knowledge_base(ctx.guild, ctx.channel)
+        if not len(processor.index):
             await send_embed(
                 ctx,
                 "Knowledge Base Empty",
@@ -77,12 +155,29 @@ class AI(commands.Cog):
             )
             return
 
+        knowledge_base = self._get_knowledge_base(processor, question)
+        if not knowledge_base:
+            await send_embed(
+                ctx,
+                "No Relevant Information",
+                "I'm unable to find relevant information in the knowledge base.",
+                discord.Color.orange(),
+                "🔍",
+            )
+            return
+
+        stream = None
         try:
             self.active_requests.add(user_id)
 
             async with ctx.typing():
+                stream = AnswerStream(ctx, ASK_EDIT_INTERVAL) if ASK_STREAMING else None
                 answer, success = await self.ai_client.ask(
-                    user_id, question, knowledge_base
+                    user_id,
+                    question,
+                    knowledge_base,
+                    stream.update if stream is not None else None,
+                    self._cache_key(processor, question),
                 )
 
                 if success:
@@ -94,7 +189,10 @@ class AI(commands.Cog):
                     title = "Error"
                     emoji = "❌"
 
-                await send_embed(ctx, title, answer, color, emoji)
+                if stream is not None:
+                    await stream.finish(title, answer, color, emoji)
+                else:
+                    await send_embed(ctx, title, answer, color, emoji)
 
         except asyncio.CancelledError:
             logger.warning(f"Request from user {user_id} was cancelled")
@@ -117,27 +215,25 @@ class AI(commands.Cog):
                 "💥",
             )
         finally:
+            if stream is not None:
+                stream.cancel()
             self.active_requests.remove(user_id)
 
-    def _get_knowledge_base(self) -> List[Dict[str, str]]:
-        if not self.nlp_cog or not hasattr(self.nlp_cog, "nlp_processor"):
-            return []
+    def _cache_key(self, processor, question):
+        """Key answers by knowledge base content and the preprocessed question."""
+        content_hash = processor.index.content_hash
+        preprocessed = processor.preprocess_text(question)
+        if content_hash is None or not preprocessed:
+            return None
+        return content_hash, preprocessed
 
+    def _get_knowledge_base(self, processor, question) -> List[Dict[str, str]]:
+        """Return the knowledge base entries most relevant to ``question``."""
         knowledge_base = []
 
-        phrases = self.nlp_cog.nlp_processor.all_phrases
-        answers = self.nlp_cog.nlp_processor.answer_map
-
-        if not phrases or not answers:
-            return []
-
-        answer_to_phrases = {}
-        for phrase, answer in zip(phrases, answers):
-            if answer not in answer_to_phrases:
-                answer_to_phrases[answer] = []
-            answer_to_phrases[answer].append(phrase)
-
-        for answer, related_phrases in answer_to_phrases.items():
+        for answer, related_phrases, _ in processor.find_relevant_answers(
+            question, ASK_CONTEXT_DOCUMENTS
+        ):
             knowledge_base.append(
                 {
                     "title": " | ".join(related_phrases[:3]),
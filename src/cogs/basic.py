@@ -41,6 +41,20 @@ class Basic(commands.Cog):
             },
         ]
 
+        if isinstance(self.bot, commands.AutoShardedBot):
+            shard_id = ctx.guild.shard_id if ctx.guild else 0
+            fields.append(
+                {
+                    "name": "Shard Latencies",
+                    "value": "\n".join(
+                        f"{'➡️ ' if sid == shard_id else ''}Shard `{sid}`: "
+                        f"`{round(latency * 1000)}ms`"
+                        for sid, latency in sorted(self.bot.latencies)[:25]
+                    ),
+                    "inline": False,
+                }
+            )
+
         status = (
             "✅ All Systems Operational"
             if gateway_latency < 300 and api_latency < 300
@@ -1,52 +1,202 @@
+import asyncio
 import discord
 from discord.ext import commands, tasks
 import logging
 import time
 import nltk
 from src.utils.nlp_processor import NLPProcessor
+from src.utils.knowledge_bases import (
+    DEFAULT_KEY,
+    KnowledgeBaseCache,
+    load_knowledge_bases,
+)
+from src.utils.batcher import MicroBatcher
+from src.utils.match_pool import MatchPool
 from src.utils.helpers import has_role, send_embed
-from src.config.settings import DATA_REFRESH_INTERVAL
+from src.config.settings import (
+    DATA_REFRESH_INTERVAL,
+    INDEX_SNAPSHOT_DIR,
+    KNOWLEDGE_BASE_CACHE_MB,
+    KNOWLEDGE_BASES_FILE,
+    SOURCE_WATCH_INTERVAL,
+    MATCH_BATCH_WINDOW_MS,
+    MATCH_BATCH_MAX_SIZE,
+    MATCH_DEADLINE_MS,
+    MATCH_MAX_PENDING,
+    MATCH_WORKERS,
+)
 
 logger = logging.getLogger(__name__)
 
 
+def format_cache_stats(label, stats):
+    return (
+        f"{label}: `{stats['hit_rate']:.1%}` hit rate "
+        f"(`{stats['hits']}` hits, `{stats['misses']}` misses, "
+        f"`{stats['size']}/{stats['maxsize']}` entries)"
+    )
+
+
 class NLPCog(commands.Cog, name="NLP"):
     def __init__(self, bot):
         self.bot = bot
         self._initialize_nltk()
-        self.nlp_processor = NLPProcessor()
-        self.last_refresh = time.time()
+        self.watch_tasks = {}
+        self.pending_refreshes = {}
+        self.knowledge_bases = KnowledgeBaseCache(
+            NLPProcessor,
+            load_knowledge_bases(KNOWLEDGE_BASES_FILE),
+            KNOWLEDGE_BASE_CACHE_MB * 1024 * 1024,
+            INDEX_SNAPSHOT_DIR,
+            on_load=self._on_load,
+            on_evict=self._on_evict,
+        )
+        self.nlp_processor = self.knowledge_bases.default
+        self.match_batcher = MicroBatcher(
+            self._match_batch, MATCH_BATCH_WINDOW_MS / 1000, MATCH_BATCH_MAX_SIZE
+        )
+        self.match_pool = (
+            MatchPool(MATCH_WORKERS, MATCH_DEADLINE_MS / 1000, MATCH_MAX_PENDING)
+            if MATCH_WORKERS > 0
+            else None
+        )
         logger.info("NLP processor initialized")
 
     def _initialize_nltk(self):
         try:
-            nltk.download("punkt", quiet=True)
+            # word_tokenize needs the English Punkt model, and the regex
+            # tokenizer reads its abbreviations from it.
+            nltk.download("punkt_tab", quiet=True)
             nltk.download("stopwords", quiet=True)
             logger.info("NLTK resources initialized")
         except Exception as e:
             logger.warning(f"Failed to initialize NLTK resources: {e}")
 
+    def watching(self, processor):
+        return processor.watched is not None
+
+    def _on_load(self, key, processor):
+        # Fresh data is loaded in the background while matches are served
+        # from the snapshot, if any. Local sources are then refreshed on
+        # change rather than polled.
+        task = asyncio.create_task(self.refresh_data(processor))
+        self.pending_refreshes[key] = task
+        task.add_done_callback(lambda _: self.pending_refreshes.pop(key, None))
+        self._watch(key, processor)
+
+    def _on_evict(self, key, processor):
+        watch_task = self.watch_tasks.pop(key, None)
+        if watch_task is not None:
+            watch_task.cancel()
+        asyncio.create_task(processor.close())
+
+    def _watch(self, key, processor):
+        """Start watching what ``processor`` reads, replacing any old watch."""
+        watch_task = self.watch_tasks.pop(key, None)
+        if watch_task is not None:
+            watch_task.cancel()
+        if self.watching(processor):
+            self.watch_tasks[key] = asyncio.create_task(self.watch_source(processor))
+
+    async def cog_load(self):
+        if self.watching(self.nlp_processor):
+            self._on_load(DEFAULT_KEY, self.nlp_processor)
+        self.periodic_refresh.start()
+
     @commands.Cog.listener()
     async def on_ready(self):
         logger.info("NLP cog loaded")
-        self.periodic_refresh.start()
 
-    def cog_unload(self):
+    async def cog_unload(self):
         self.periodic_refresh.cancel()
+        for task in self.watch_tasks.values():
+            task.cancel()
+        self.match_batcher.close()
+        if self.match_pool is not None:
+            self.match_pool.close()
+        for processor in self.knowledge_bases.processors():
+            await processor.close()
 
-    @tasks.loop(seconds=DATA_REFRESH_INTERVAL)
-    async def periodic_refresh(self):
+    async def refresh_data(self, processor):
         logger.info("Refreshing NLP model data...")
-        self.nlp_processor.process_data()
-        self.last_refresh = time.time()
+        await processor.refresh()
+        processor.last_refresh = time.time()
+        self.knowledge_bases.trim()
         logger.info("NLP model data refreshed")
 
-    @periodic_refresh.before_loop
-    async def before_refresh(self):
-        await self.bot.wait_until_ready()
+    @tasks.loop(seconds=DATA_REFRESH_INTERVAL)
+    async def periodic_refresh(self):
+        # Watched knowledge bases refresh on change; cold ones when loaded.
+        # Readers are refreshed here too, so that one of them takes over
+        # building when the builder process has gone.
+        refreshing = [
+            (key, processor, processor.reader)
+            for key, processor in self.knowledge_bases.items()
+            if processor.reader or not self.watching(processor)
+        ]
+        await asyncio.gather(
+            *(self.refresh_data(processor) for _, processor, _ in refreshing)
+        )
+        for key, processor, was_reader in refreshing:
+            if was_reader and not processor.reader:
+                self._watch(key, processor)
+
+    async def watch_source(self, processor):
+        # A reader that takes over building switches to its own source.
+        while (watched := processor.watched) is not None:
+            logger.info(f"Watching {watched.name} for changes")
+            async for _ in watched.changes(SOURCE_WATCH_INTERVAL):
+                await self.refresh_data(processor)
+                if processor.watched is not watched:
+                    break
+            else:
+                return
+
+    def next_update(self, processor):
+        if self.watching(processor):
+            return "On change"
+        return f"<t:{int(processor.last_refresh + DATA_REFRESH_INTERVAL)}:R>"
+
+    async def knowledge_base(self, guild, channel):
+        """Return the processor answering in a channel, loading it if needed.
+
+        A knowledge base with neither a snapshot nor data yet waits for its
+        first refresh instead of answering from an empty index.
+        """
+        key = self.knowledge_bases.resolve(guild.id if guild else None, channel.id)
+        processor = self.knowledge_bases.get(key)
+        pending = self.pending_refreshes.get(key)
+        if pending is not None and not len(processor.index):
+            await asyncio.shield(pending)
+        return processor
+
+    async def _match_batch(self, items):
+        groups = {}
+        for position, (processor, text) in enumerate(items):
+            groups.setdefault(processor, []).append((position, text))
+
+        results = [None] * len(items)
+        batches = await asyncio.gather(
+            *(
+                self._match_group(processor, [text for _, text in group])
+                for processor, group in groups.items()
+            )
+        )
+        for group, matches in zip(groups.values(), batches):
+            for (position, _), match in zip(group, matches):
+                results[position] = match
+        return results
+
+    async def _match_group(self, processor, texts):
+        if self.match_pool is None:
+            return processor.find_best_matches(texts)
+        return await self.match_pool.match(processor, texts)
 
     async def process_message(self, message):
-        answer, similarity = self.nlp_processor.find_best_match(message.content)
+        processor = await self.knowledge_base(message.guild, message.channel)
+        answer, similarity = await self.match_batcher.submit(
+            (processor, message.content)
+        )
         if answer and similarity > 0.3:
             try:
                 await message.reply(f"{answer}", suppress_embeds=True)
@@ -62,25 +212,25 @@ class NLPCog(commands.Cog, name="NLP"):
 
     @commands.command(
         name="update",
-        description="Refresh response database from Google Sheets to get the latest answers",
+        description="Refresh response database from the knowledge source to get the latest answers",
     )
     @has_role()
     async def refresh_nlp(self, ctx):
         logger.info(f"{ctx.author} requested data refresh")
         await ctx.send("📡 Refreshing response database...")
 
-        self.nlp_processor.process_data()
-        self.last_refresh = time.time()
+        processor = await self.knowledge_base(ctx.guild, ctx.channel)
+        await self.refresh_data(processor)
 
         fields = [
             {
                 "name": "Database Size",
-                "value": f"`{len(self.nlp_processor.all_phrases)}` trigger phrases loaded",
+                "value": f"`{len(processor.index)}` trigger phrases loaded",
                 "inline": False,
             },
             {
                 "name": "Next Update",
-                "value": f"<t:{int(self.last_refresh + DATA_REFRESH_INTERVAL)}:R>",
+                "value": self.next_update(processor),
                 "inline": False,
             },
         ]
@@ -88,7 +238,7 @@ class NLPCog(commands.Cog, name="NLP"):
         await send_embed(
             ctx,
             "Database Update Complete",
-            "✅ Successfully refreshed response database from Google Sheets",
+            "✅ Successfully refreshed response database from the knowledge source",
             discord.Color.green(),
             "🔄",
             fields,
@@ -100,30 +250,129 @@ class NLPCog(commands.Cog, name="NLP"):
     )
     @has_role()
     async def nlp_status(self, ctx):
-        phrases_count = len(self.nlp_processor.all_phrases)
+        processor = await self.knowledge_base(ctx.guild, ctx.channel)
+        index = processor.index
+        phrases_count = len(index)
+        cache_stats = processor.cache_stats()
+        gate_checked = processor.gate_checked
+        gate_rejected = processor.gate_rejected
+        kb_stats = self.knowledge_bases.stats()
+        source = processor.source
 
         fields = [
+            {
+                "name": "Knowledge Base",
+                "value": f"`{source.name if source else 'none'}`",
+                "inline": True,
+            },
             {
                 "name": "Database Size",
                 "value": f"`{phrases_count}` trigger phrases",
                 "inline": True,
             },
+            {
+                "name": "Index Size",
+                "value": (
+                    f"`{index.memory_bytes() / 1024:.1f}` KiB, "
+                    f"`{len(index.answers)}` answers, "
+                    f"built in `{index.build_seconds * 1000:.0f}` ms"
+                ),
+                "inline": True,
+            },
             {
                 "name": "Last Update",
-                "value": f"<t:{int(self.last_refresh)}:R>",
+                "value": f"<t:{int(processor.last_refresh)}:R>",
                 "inline": True,
             },
             {
                 "name": "Next Update",
-                "value": f"<t:{int(self.last_refresh + DATA_REFRESH_INTERVAL)}:R>",
+                "value": self.next_update(processor),
                 "inline": True,
             },
             {
                 "name": "Update Interval",
-                "value": f"`{DATA_REFRESH_INTERVAL}` seconds",
+                "value": (
+                    f"Watching `{source.name}`"
+                    if self.watching(processor)
+                    else f"`{DATA_REFRESH_INTERVAL}` seconds"
+                ),
                 "inline": True,
             },
+            {
+                "name": "Index Cache",
+                "value": (
+                    f"`{kb_stats['resident']}/{kb_stats['configured']}` knowledge "
+                    f"bases resident, `{kb_stats['bytes'] / 1048576:.1f}/"
+                    f"{kb_stats['budget'] / 1048576:.0f}` MiB, "
+                    f"`{kb_stats['loads']}` loads, "
+                    f"`{kb_stats['evictions']}` evictions"
+                ),
+                "inline": False,
+            },
+            {
+                "name": "Caches",
+                "value": "\n".join(
+                    [
+                        format_cache_stats("Stems", cache_stats["stems"]),
+                        format_cache_stats("Messages", cache_stats["texts"]),
+                        format_cache_stats("Match Results", cache_stats["results"]),
+                    ]
+                ),
+                "inline": False,
+            },
+            {
+                "name": "Match Batching",
+                "value": (
+                    f"`{self.match_batcher.items}` messages in "
+                    f"`{self.match_batcher.batches}` batches "
+                    f"(`{self.match_batcher.average_size:.1f}` per batch)"
+                ),
+                "inline": False,
+            },
+            {
+                "name": "Vocabulary Pre-filter",
+                "value": (
+                    f"`{gate_rejected}` of `{gate_checked}` messages rejected "
+                    f"(`{gate_rejected / gate_checked if gate_checked else 0:.1%}`)"
+                ),
+                "inline": False,
+            },
         ]
+        if self.match_pool is not None:
+            pool_stats = self.match_pool.stats()
+            fields.append(
+                {
+                    "name": "Match Pool",
+                    "value": (
+                        f"`{pool_stats['workers']}` workers, "
+                        f"`{pool_stats['pending']}` pending, "
+                        f"`{pool_stats['batches']}` batches, "
+                        f"`{pool_stats['timeouts']}` timeouts, "
+                        f"`{pool_stats['shed']}` shed, "
+                        f"`{pool_stats['fallbacks']}` in-process"
+                    ),
+                    "inline": False,
+                }
+            )
+        ai_cog = self.bot.get_cog("AI")
+        if ai_cog is not None:
+            ai_stats = ai_cog.ai_client.stats()
+            value = (
+                f"`{ai_stats['in_flight']}/{ai_stats['limit']}` in flight, "
+                f"`{ai_stats['waiting']}` waiting, "
+                f"`{ai_stats['timeouts']}` timeouts, "
+                f"`{ai_stats['coalesced']}` coalesced "
+                f"(`{ai_stats['dedup_rate']:.1%}`)"
+            )
+            if ai_stats["cache"] is not None:
+                value += "\n" + format_cache_stats("Answers", ai_stats["cache"])
+            fields.append(
+                {
+                    "name": "AI Requests",
+                    "value": value,
+                    "inline": False,
+                }
+            )
 
         await send_embed(
             ctx,
@@ -140,7 +389,9 @@ class NLPCog(commands.Cog, name="NLP"):
     )
     @has_role()
     async def list_keywords(self, ctx):
-        if not self.nlp_processor.all_phrases:
+        processor = await self.knowledge_base(ctx.guild, ctx.channel)
+        index = processor.index
+        if not len(index):
             await send_embed(
                 ctx,
                 "Empty Database",
@@ -150,15 +401,6 @@ class NLPCog(commands.Cog, name="NLP"):
             )
             return
 
-        keyword_responses = {}
-        for phrase, answer in zip(
-            self.nlp_processor.all_phrases, self.nlp_processor.answer_map
-        ):
-            if answer in keyword_responses:
-                keyword_responses[answer].append(phrase)
-            else:
-                keyword_responses[answer] = [phrase]
-
         embeds = []
         current_embed = discord.Embed(
             title="Response Configuration",
@@ -171,7 +413,7 @@ class NLPCog(commands.Cog, name="NLP"):
         )
         current_length = 0
 
-        for answer, keywords in keyword_responses.items():
+        for answer, keywords in zip(index.answers, index.answer_phrases):
             field_content = ", ".join([f"`{k}`" for k in keywords])
             if current_length + len(field_content) + len(answer) > 5500:
                 embeds.append(current_embed)
@@ -214,7 +456,8 @@ class NLPCog(commands.Cog, name="NLP"):
             )
             return
 
-        answer, similarity = self.nlp_processor.find_best_match(query)
+        processor = await self.knowledge_base(ctx.guild, ctx.channel)
+        answer, similarity = processor.find_best_match(query)
 
         if answer:
             fields = [
@@ -2,12 +2,21 @@ import discord
 from discord.ext import commands, tasks
 import logging
 
+from src.config.settings import CLUSTER_ID, CLUSTER_PROCESSES, CLUSTER_STATE_DIR
+from src.utils.cluster import ClusterState
+
 logger = logging.getLogger(__name__)
 
 
 class Tasks(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
+        # Reports older than two missed updates belong to dead processes.
+        self.cluster = (
+            ClusterState(CLUSTER_STATE_DIR, CLUSTER_ID, stale_after=45 * 60)
+            if CLUSTER_PROCESSES > 1
+            else None
+        )
         self.status_task.start()
 
     def cog_unload(self):
@@ -20,10 +29,16 @@ class Tasks(commands.Cog):
     @tasks.loop(minutes=15)
     async def status_task(self):
         """Update bot's status with current server count and help command info"""
+        guilds = len(self.bot.guilds)
+        if self.cluster is not None:
+            # Only AutoShardedBot has shard_ids; a plain Bot runs one shard.
+            self.cluster.publish(guilds, getattr(self.bot, "shard_ids", None))
+            guilds = self.cluster.total_guilds()
+
         await self.bot.change_presence(
             activity=discord.Activity(
                 type=discord.ActivityType.watching,
-                name=f"over {len(self.bot.guilds)} communities | Use !help",
+                name=f"over {guilds} communities | Use !help",
             )
         )
 
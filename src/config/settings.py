@@ -8,6 +8,16 @@ BOT_PREFIX = os.getenv("BOT_PREFIX", "!")
 ADMIN_ROLE = os.getenv("ADMIN_ROLE", "Bot Admin")
 OWNER_ID = int(os.getenv("OWNER_ID", "0"))
 
+# Sharding Configuration
+SHARDED = os.getenv("SHARDED", "false").lower() == "true"
+SHARD_COUNT = int(os.getenv("SHARD_COUNT", "0"))
+SHARD_IDS = os.getenv("SHARD_IDS", "")
+CLUSTER_PROCESSES = int(os.getenv("CLUSTER_PROCESSES", "1"))
+CLUSTER_ID = int(os.getenv("CLUSTER_ID", "0"))
+CLUSTER_STATE_DIR = os.getenv("CLUSTER_STATE_DIR", "data/cluster")
+DISCORD_API_BASE = os.getenv("DISCORD_API_BASE", "")
+DISCORD_GATEWAY_URL = os.getenv("DISCORD_GATEWAY_URL", "")
+
 GOOGLE_SHEET_ID = os.getenv("GOOGLE_SHEET_ID", "")
 GOOGLE_SHEET_URL = (
     f"https://docs.google.com/spreadsheets/d/{GOOGLE_SHEET_ID}/export?format=csv"
@@ -15,13 +25,50 @@ GOOGLE_SHEET_URL = (
     else ""
 )
 DATA_REFRESH_INTERVAL = int(os.getenv("DATA_REFRESH_INTERVAL", "600"))
+KNOWLEDGE_SOURCE = os.getenv("KNOWLEDGE_SOURCE", "sheet")
+KNOWLEDGE_TABLE = os.getenv("KNOWLEDGE_TABLE", "responses")
+SOURCE_WATCH_INTERVAL = float(os.getenv("SOURCE_WATCH_INTERVAL", "0.5"))
+KNOWLEDGE_BASES_FILE = os.getenv("KNOWLEDGE_BASES_FILE", "")
+KNOWLEDGE_BASE_CACHE_MB = int(os.getenv("KNOWLEDGE_BASE_CACHE_MB", "256"))
+INDEX_SNAPSHOT_DIR = os.getenv("INDEX_SNAPSHOT_DIR", "data/index")
+INDEX_ROLE = os.getenv("INDEX_ROLE", "auto")
+SHEET_FETCH_TIMEOUT = float(os.getenv("SHEET_FETCH_TIMEOUT", "30"))
+SHEET_FETCH_RETRIES = int(os.getenv("SHEET_FETCH_RETRIES", "3"))
+SHEET_FETCH_BACKOFF = float(os.getenv("SHEET_FETCH_BACKOFF", "1"))
+MATCH_BATCH_WINDOW_MS = float(os.getenv("MATCH_BATCH_WINDOW_MS", "5"))
+MATCH_BATCH_MAX_SIZE = int(os.getenv("MATCH_BATCH_MAX_SIZE", "64"))
+MATCH_WORKERS = int(os.getenv("MATCH_WORKERS", "0"))
+MATCH_DEADLINE_MS = float(os.getenv("MATCH_DEADLINE_MS", "2000"))
+MATCH_MAX_PENDING = int(os.getenv("MATCH_MAX_PENDING", "1000"))
+STEM_CACHE_SIZE = int(os.getenv("STEM_CACHE_SIZE", "50000"))
+TEXT_CACHE_SIZE = int(os.getenv("TEXT_CACHE_SIZE", "10000"))
+TOKENIZER_BACKEND = os.getenv("TOKENIZER_BACKEND", "nltk")
+RESULT_CACHE_SIZE = int(os.getenv("RESULT_CACHE_SIZE", "10000"))
+RESULT_CACHE_TTL = int(os.getenv("RESULT_CACHE_TTL", "3600"))
+KEYWORD_SCAN = os.getenv("KEYWORD_SCAN", "false").lower() == "true"
+KEYWORD_SCAN_MIN_TOKENS = int(os.getenv("KEYWORD_SCAN_MIN_TOKENS", "2"))
+KEYWORD_SCAN_SCORE = float(os.getenv("KEYWORD_SCAN_SCORE", "0.5"))
+VECTORIZER_MODE = os.getenv("VECTORIZER_MODE", "word")
+HASH_FEATURES = int(os.getenv("HASH_FEATURES", "262144"))
+MATCH_ENGINE = os.getenv("MATCH_ENGINE", "tfidf")
+LSA_COMPONENTS = int(os.getenv("LSA_COMPONENTS", "128"))
 
 # OpenAI Configuration
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
 OPENAI_BASE_URL = os.getenv("OPENAI_BASE_URL", "https://api.openai.com/v1")
 OPENAI_MODEL = os.getenv("OPENAI_MODEL", "gpt-4o-mini")
+OPENAI_TIMEOUT = float(os.getenv("OPENAI_TIMEOUT", "60"))
+OPENAI_MAX_CONCURRENCY = int(os.getenv("OPENAI_MAX_CONCURRENCY", "50"))
+OPENAI_MAX_CONNECTIONS = int(os.getenv("OPENAI_MAX_CONNECTIONS", "100"))
 RATE_LIMIT_INTERVAL = int(os.getenv("RATE_LIMIT_INTERVAL", "60"))
 RATE_LIMIT_MAX_REQUESTS = int(os.getenv("RATE_LIMIT_MAX_REQUESTS", "3"))
+ASK_CONTEXT_DOCUMENTS = int(os.getenv("ASK_CONTEXT_DOCUMENTS", "8"))
+ASK_CONTEXT_TOKENS = int(os.getenv("ASK_CONTEXT_TOKENS", "2000"))
+ANSWER_CACHE_FILE = os.getenv("ANSWER_CACHE_FILE", "data/answer_cache.db")
+ANSWER_CACHE_SIZE = int(os.getenv("ANSWER_CACHE_SIZE", "5000"))
+ANSWER_CACHE_TTL = int(os.getenv("ANSWER_CACHE_TTL", "86400"))
+ASK_STREAMING = os.getenv("ASK_STREAMING", "true").lower() == "true"
+ASK_EDIT_INTERVAL = float(os.getenv("ASK_EDIT_INTERVAL", "1"))
 
 LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
 LOGGING_CONFIG = {
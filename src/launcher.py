@@ -0,0 +1,99 @@
+import asyncio
+import logging
+import logging.config
+import os
+import signal
+import sys
+
+import aiohttp
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from src.config.settings import (
+    BOT_TOKEN,
+    CLUSTER_PROCESSES,
+    DISCORD_API_BASE,
+    LOGGING_CONFIG,
+    SHARD_COUNT,
+)
+from src.utils.cluster import shard_ranges
+
+logging.config.dictConfig(LOGGING_CONFIG)
+logger = logging.getLogger(__name__)
+
+MAIN = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "run.py"
+)
+RESTART_DELAY = 5
+
+
+async def recommended_shard_count():
+    base = DISCORD_API_BASE or "https://discord.com/api/v10"
+    headers = {"Authorization": f"Bot {BOT_TOKEN}"}
+    async with aiohttp.ClientSession() as session:
+        async with session.get(f"{base}/gateway/bot", headers=headers) as response:
+            response.raise_for_status()
+            return (await response.json())["shards"]
+
+
+async def run_cluster(cluster_id, shard_ids, shard_count, processes):
+    """Keep one bot process running the given shards until shutdown."""
+    env = dict(
+        os.environ,
+        SHARDED="true",
+        SHARD_COUNT=str(shard_count),
+        SHARD_IDS=",".join(map(str, shard_ids)),
+        CLUSTER_ID=str(cluster_id),
+    )
+    while True:
+        logger.info(f"Starting cluster {cluster_id} with shards {shard_ids}")
+        process = await asyncio.create_subprocess_exec(sys.executable, MAIN, env=env)
+        processes[cluster_id] = process
+        code = await process.wait()
+        if code == 0:
+            logger.info(f"Cluster {cluster_id} exited")
+            return
+        logger.error(
+            f"Cluster {cluster_id} exited with code {code}, "
+            f"restarting in {RESTART_DELAY} seconds"
+        )
+        await asyncio.sleep(RESTART_DELAY)
+
+
+async def main():
+    if not BOT_TOKEN:
+        logger.critical("No bot token found")
+        return
+
+    shard_count = SHARD_COUNT or await recommended_shard_count()
+    ranges = shard_ranges(shard_count, CLUSTER_PROCESSES)
+    logger.info(f"Launching {len(ranges)} processes for {shard_count} shards")
+
+    processes = {}
+    tasks = [
+        asyncio.create_task(run_cluster(cluster_id, shard_ids, shard_count, processes))
+        for cluster_id, shard_ids in enumerate(ranges)
+    ]
+
+    def shutdown():
+        if all(task.done() or task.cancelling() for task in tasks):
+            return
+        logger.info("Shutting down cluster")
+        for task in tasks:
+            task.cancel()
+        for process in processes.values():
+            if process.returncode is None:
+                process.terminate()
+
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, shutdown)
+
+    await asyncio.gather(*tasks, return_exceptions=True)
+    await asyncio.gather(
+        *(process.wait() for process in processes.values()), return_exceptions=True
+    )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
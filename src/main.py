@@ -5,11 +5,22 @@ import os
 import sys
 from typing import List
 import discord
+import yarl
 from discord.ext import commands
 
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
 
-from src.config.settings import BOT_TOKEN, BOT_PREFIX, LOGGING_CONFIG
+from src.config.settings import (
+    BOT_TOKEN,
+    BOT_PREFIX,
+    DISCORD_API_BASE,
+    DISCORD_GATEWAY_URL,
+    LOGGING_CONFIG,
+    SHARD_COUNT,
+    SHARD_IDS,
+    SHARDED,
+)
+from src.utils.cluster import parse_shard_ids
 from src.utils.helpers import get_cogs_list
 
 logging.config.dictConfig(LOGGING_CONFIG)
@@ -19,8 +30,26 @@ intents = discord.Intents.default()
 intents.message_content = True
 intents.members = True
 
+# Let the bot run against a local stand-in for Discord's API and gateway.
+# These are discord.py class attributes, so the override applies to every
+# client in the process; it is meant for testing only.
+if DISCORD_API_BASE:
+    discord.http.Route.BASE = DISCORD_API_BASE
+if DISCORD_GATEWAY_URL:
+    discord.gateway.DiscordWebSocket.DEFAULT_GATEWAY = yarl.URL(DISCORD_GATEWAY_URL)
 
-class LexisBot(commands.Bot):
+
+def shard_options():
+    if not SHARDED:
+        return {}
+    options = {}
+    if SHARD_COUNT:
+        options["shard_count"] = SHARD_COUNT
+        options["shard_ids"] = parse_shard_ids(SHARD_IDS)
+    return options
+
+
+class LexisBot(commands.AutoShardedBot if SHARDED else commands.Bot):
     def __init__(self):
         super().__init__(
             command_prefix=commands.when_mentioned_or(BOT_PREFIX),
@@ -31,6 +60,7 @@ class LexisBot(commands.Bot):
                 type=discord.ActivityType.listening,
                 name=f"Type {BOT_PREFIX}help for commands",
             ),
+            **shard_options(),
         )
         self.initial_extensions: List[str] = get_cogs_list()
 
@@ -45,6 +75,8 @@ class LexisBot(commands.Bot):
     async def on_ready(self):
         logger.info(f"Logged in as {self.user}")
         logger.info(f"Connected to {len(self.guilds)} guilds")
+        if SHARDED:
+            logger.info(f"Running shards {self.shard_ids} of {self.shard_count}")
         try:
             await self.tree.sync()
         except Exception:
@@ -0,0 +1,55 @@
+from collections import deque
+
+
+class AhoCorasick:
+    """Token-level Aho-Corasick automaton.
+
+    Patterns are sequences of tokens, each with an associated value, and
+    ``search`` reports the values of every pattern occurring contiguously in
+    a token sequence in one left-to-right pass.
+    """
+
+    def __init__(self, patterns):
+        self.transitions = [{}]
+        self.fail = [0]
+        self.outputs = [()]
+
+        for tokens, value in patterns:
+            state = 0
+            for token in tokens:
+                next_state = self.transitions[state].get(token)
+                if next_state is None:
+                    next_state = len(self.transitions)
+                    self.transitions[state][token] = next_state
+                    self.transitions.append({})
+                    self.fail.append(0)
+                    self.outputs.append(())
+                state = next_state
+            self.outputs[state] += (value,)
+
+        queue = deque(self.transitions[0].values())
+        while queue:
+            state = queue.popleft()
+            for token, next_state in self.transitions[state].items():
+                queue.append(next_state)
+                fallback = self.fail[state]
+                while fallback and token not in self.transitions[fallback]:
+                    fallback = self.fail[fallback]
+                self.fail[next_state] = self.transitions[fallback].get(token, 0)
+                if self.fail[next_state] == next_state:
+                    self.fail[next_state] = 0
+                self.outputs[next_state] += self.outputs[self.fail[next_state]]
+
+    def __len__(self):
+        return len(self.transitions) - 1
+
+    def search(self, tokens):
+        hits = []
+        state = 0
+        for token in tokens:
+            while state and token not in self.transitions[state]:
+                state = self.fail[state]
+            state = self.transitions[state].get(token, 0)
+            if self.outputs[state]:
+                hits.extend(self.outputs[state])
+        return hits
@@ -0,0 +1,73 @@
+import asyncio
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class MicroBatcher:
+    """Coalesce items submitted within a short window into one handler call.
+
+    ``handler`` is a coroutine function taking a list of items and returning
+    a list of results in the same order. A batch is flushed when the window
+    expires or as soon as ``max_size`` items are pending.
+    """
+
+    def __init__(self, handler, window: float, max_size: int):
+        self.handler = handler
+        self.window = window
+        self.max_size = max(1, max_size)
+        self.pending = []
+        self.flush_handle = None
+        self.running = set()
+        self.batches = 0
+        self.items = 0
+
+    async def submit(self, item):
+        if self.window <= 0:
+            return (await self.handler([item]))[0]
+
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self.pending.append((item, future))
+
+        if len(self.pending) >= self.max_size:
+            self._flush()
+        elif self.flush_handle is None:
+            self.flush_handle = loop.call_later(self.window, self._flush)
+
+        return await future
+
+    def _flush(self):
+        if self.flush_handle is not None:
+            self.flush_handle.cancel()
+            self.flush_handle = None
+
+        batch, self.pending = self.pending, []
+        if batch:
+            task = asyncio.create_task(self._run(batch))
+            self.running.add(task)
+            task.add_done_callback(self.running.discard)
+
+    async def _run(self, batch):
+        items = [item for item, _ in batch]
+        try:
+            results = await self.handler(items)
+        except Exception as e:
+            logger.error(f"Batch of {len(items)} items failed: {e}")
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        self.batches += 1
+        self.items += len(items)
+        for (_, future), result in zip(batch, results):
+            if not future.done():
+                future.set_result(result)
+
+    @property
+    def average_size(self):
+        return self.items / self.batches if self.batches else 0.0
+
+    def close(self):
+        self._flush()
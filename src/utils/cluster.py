@@ -0,0 +1,80 @@
+import json
+import logging
+import os
+import time
+
+logger = logging.getLogger(__name__)
+
+
+def shard_ranges(shard_count: int, processes: int):
+    """Split shard ids ``0..shard_count - 1`` into one contiguous run per process."""
+    processes = max(1, min(processes, shard_count))
+    size, extra = divmod(shard_count, processes)
+    ranges = []
+    start = 0
+    for cluster_id in range(processes):
+        end = start + size + (1 if cluster_id < extra else 0)
+        ranges.append(list(range(start, end)))
+        start = end
+    return ranges
+
+
+def parse_shard_ids(value: str):
+    """Parse ``"0,1,2"`` or ``"0-2"`` into a list of shard ids, or ``None``."""
+    shard_ids = []
+    for part in value.split(","):
+        part = part.strip()
+        if not part:
+            continue
+        if "-" in part:
+            first, last = part.split("-", 1)
+            shard_ids.extend(range(int(first), int(last) + 1))
+        else:
+            shard_ids.append(int(part))
+    return shard_ids or None
+
+
+class ClusterState:
+    """Per-process guild counts shared through small files in ``directory``.
+
+    Each process of a cluster publishes its own counts; any process can sum
+    the reports that are fresher than ``stale_after`` seconds to get totals
+    for the whole bot.
+    """
+
+    def __init__(self, directory: str, cluster_id: int, stale_after: float):
+        self.directory = directory
+        self.cluster_id = cluster_id
+        self.stale_after = stale_after
+
+    def publish(self, guilds: int, shards):
+        os.makedirs(self.directory, exist_ok=True)
+        path = os.path.join(self.directory, f"cluster-{self.cluster_id}.json")
+        staging = f"{path}.{os.getpid()}.tmp"
+        with open(staging, "w", encoding="utf-8") as f:
+            json.dump({"guilds": guilds, "shards": shards, "updated": time.time()}, f)
+        os.replace(staging, path)
+
+    def reports(self):
+        reports = []
+        try:
+            entries = os.listdir(self.directory)
+        except FileNotFoundError:
+            return reports
+
+        now = time.time()
+        for entry in entries:
+            if not (entry.startswith("cluster-") and entry.endswith(".json")):
+                continue
+            try:
+                with open(os.path.join(self.directory, entry), encoding="utf-8") as f:
+                    report = json.load(f)
+            except (OSError, ValueError) as e:
+                logger.warning(f"Skipping unreadable cluster report {entry}: {e}")
+                continue
+            if now - report.get("updated", 0) <= self.stale_after:
+                reports.append(report)
+        return reports
+
+    def total_guilds(self):
+        return sum(report["guilds"] for report in self.reports())
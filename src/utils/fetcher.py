@@ -0,0 +1,106 @@
+import asyncio
+import logging
+import random
+
+import aiohttp
+
+logger = logging.getLogger(__name__)
+
+RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+
+
+class FetchError(Exception):
+    """Raised when a download still fails after every retry."""
+
+
+class ConditionalFetcher:
+    """Download a URL over a reused session, skipping unchanged content.
+
+    The ``ETag`` and ``Last-Modified`` validators of the last successful
+    response are sent back as ``If-None-Match``/``If-Modified-Since``, so an
+    unchanged resource costs a 304 with no body. Timeouts, connection errors
+    and retryable statuses are retried with jittered exponential backoff.
+    """
+
+    def __init__(
+        self,
+        url: str,
+        timeout: float = 30.0,
+        retries: int = 3,
+        backoff: float = 1.0,
+        max_backoff: float = 60.0,
+    ):
+        self.url = url
+        self.timeout = aiohttp.ClientTimeout(total=timeout)
+        self.retries = max(0, retries)
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.etag = None
+        self.last_modified = None
+        self.session = None
+        self.requests = 0
+        self.not_modified = 0
+
+    def _headers(self):
+        headers = {}
+        if self.etag:
+            headers["If-None-Match"] = self.etag
+        if self.last_modified:
+            headers["If-Modified-Since"] = self.last_modified
+        return headers
+
+    def _delay(self, attempt):
+        # Full jitter keeps several bots from retrying in lockstep.
+        return random.uniform(0, min(self.max_backoff, self.backoff * 2**attempt))
+
+    async def _session(self):
+        if self.session is None or self.session.closed:
+            self.session = aiohttp.ClientSession(timeout=self.timeout)
+        return self.session
+
+    async def fetch(self):
+        """Return the body, or ``None`` if it has not changed since last time.
+
+        Raises :class:`FetchError` once all attempts have failed.
+        """
+        session = await self._session()
+        error = None
+
+        for attempt in range(self.retries + 1):
+            if attempt:
+                delay = self._delay(attempt - 1)
+                logger.warning(
+                    f"Fetch of {self.url} failed ({error}), retrying in {delay:.1f}s"
+                )
+                await asyncio.sleep(delay)
+
+            self.requests += 1
+            try:
+                async with session.get(self.url, headers=self._headers()) as response:
+                    if response.status == 304:
+                        self.not_modified += 1
+                        return None
+                    if response.status in RETRY_STATUSES:
+                        error = f"HTTP {response.status}"
+                        continue
+                    response.raise_for_status()
+                    body = await response.read()
+                    self.etag = response.headers.get("ETag")
+                    self.last_modified = response.headers.get("Last-Modified")
+                    return body
+            except aiohttp.ClientResponseError as e:
+                raise FetchError(f"HTTP {e.status}") from e
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                error = str(e) or type(e).__name__
+
+        raise FetchError(error)
+
+    def reset(self):
+        """Forget the validators so the next fetch downloads the full body."""
+        self.etag = None
+        self.last_modified = None
+
+    async def close(self):
+        if self.session is not None and not self.session.closed:
+            await self.session.close()
+        self.session = None
@@ -13,10 +13,10 @@ def get_cogs_list():
     return cogs
 
 
-async def send_embed(
+def build_embed(
     ctx, title, description, color=discord.Color.blue(), emoji="", fields=None
 ):
-    """Create and send a standardized embed message
+    """Create a standardized embed message
 
     Args:
         ctx: Command context
@@ -49,8 +49,18 @@ async def send_embed(
             )
 
     embed.set_footer(text=f"{ctx.bot.user.name} | Use !help for commands")
+    return embed
+
 
-    await ctx.message.reply(embed=embed)
+async def send_embed(
+    ctx, title, description, color=discord.Color.blue(), emoji="", fields=None
+):
+    """Create and send a standardized embed message, returning the reply
+
+    Takes the same arguments as ``build_embed``.
+    """
+    embed = build_embed(ctx, title, description, color, emoji, fields)
+    return await ctx.message.reply(embed=embed)
 
 
 def has_role(role_name=ADMIN_ROLE):
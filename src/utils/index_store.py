@@ -0,0 +1,257 @@
+import json
+import logging
+import os
+import shutil
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+import numpy as np
+from scipy import sparse
+from sklearn.feature_extraction.text import TfidfVectorizer
+
+from src.utils.nlp_index import NLPIndex, PhraseGroups, StringMap, StringTable
+from src.utils.vectorizers import HashedCharVectorizer
+
+logger = logging.getLogger(__name__)
+
+FORMAT_VERSION = 3
+CURRENT_FILE = "CURRENT"
+LOCK_FILE = "BUILDER.lock"
+ROW_PHRASES_FILE = "row_phrases.json"
+ARRAYS = (
+    "answer_ids",
+    "answer_phrase_ids",
+    "answer_phrase_indptr",
+    "exact_ids",
+    "exact_slots",
+    "idf",
+    "matrix_data",
+    "matrix_indices",
+    "matrix_indptr",
+    "phrase_counts",
+    "postings_data",
+    "postings_indices",
+    "postings_indptr",
+    "term_ids",
+    "term_slots",
+)
+# Stored as a ``<name>_blob`` of UTF-8 text and its ``<name>_offsets``.
+STRING_TABLES = ("answers", "exact_keys", "phrases", "terms")
+# Only present in snapshots built with the LSA engine.
+DENSE_ARRAYS = ("embeddings", "projection")
+
+
+def save_index(index, directory, signature):
+    """Write ``index`` under ``directory`` and atomically mark it current.
+
+    Each snapshot lives in its own ``gen-<n>`` folder of ``.npy`` arrays and
+    a ``meta.json``; the ``CURRENT`` pointer is swapped with ``os.replace``
+    only once every file is on disk, so readers never see a partial write.
+    Strings are stored as UTF-8 blobs that readers memory-map like the
+    arrays. ``row_phrases``, which only a builder uses, goes in a file of
+    its own.
+    """
+    os.makedirs(directory, exist_ok=True)
+    name = f"gen-{index.generation}-{os.getpid()}"
+    staging = os.path.join(directory, f".{name}.tmp")
+    shutil.rmtree(staging, ignore_errors=True)
+    os.makedirs(staging)
+
+    vocabulary = StringMap.build(getattr(index.vectorizer, "vocabulary_", {}))
+    exact_phrases = StringMap.build(index.exact_phrases)
+    answer_phrases = PhraseGroups.build(index.phrases, index.answer_phrases)
+    tables = {
+        "answers": StringTable.build(index.answers),
+        "exact_keys": exact_phrases.keys_table,
+        "phrases": StringTable.build(index.phrases),
+        "terms": vocabulary.keys_table,
+    }
+    arrays = {
+        "answer_ids": index.answer_ids,
+        "answer_phrase_ids": answer_phrases.phrase_ids,
+        "answer_phrase_indptr": answer_phrases.indptr,
+        "exact_ids": exact_phrases.values_array,
+        "exact_slots": exact_phrases.slots,
+        "idf": index.vectorizer.idf_,
+        "matrix_data": index.tfidf_matrix.data,
+        "matrix_indices": index.tfidf_matrix.indices,
+        "matrix_indptr": index.tfidf_matrix.indptr,
+        "phrase_counts": index.phrase_counts,
+        "postings_data": index.postings.data,
+        "postings_indices": index.postings.indices,
+        "postings_indptr": index.postings.indptr,
+        "term_ids": vocabulary.values_array,
+        "term_slots": vocabulary.slots,
+    }
+    for key, table in tables.items():
+        arrays[f"{key}_blob"] = table.blob
+        arrays[f"{key}_offsets"] = table.offsets
+    for key in DENSE_ARRAYS:
+        if getattr(index, key) is not None:
+            arrays[key] = getattr(index, key)
+    for key, array in arrays.items():
+        np.save(os.path.join(staging, f"{key}.npy"), array)
+
+    meta = {
+        "version": FORMAT_VERSION,
+        "signature": signature,
+        "generation": index.generation,
+        "content_hash": index.content_hash,
+        "shape": list(index.tfidf_matrix.shape),
+        "hashed": (
+            {
+                "n_features": index.vectorizer.n_features,
+                "ngram_range": list(index.vectorizer.ngram_range),
+            }
+            if isinstance(index.vectorizer, HashedCharVectorizer)
+            else None
+        ),
+    }
+    with open(os.path.join(staging, "meta.json"), "w", encoding="utf-8") as f:
+        json.dump(meta, f)
+    with open(os.path.join(staging, ROW_PHRASES_FILE), "w", encoding="utf-8") as f:
+        json.dump({key: list(value) for key, value in index.row_phrases.items()}, f)
+
+    target = os.path.join(directory, name)
+    shutil.rmtree(target, ignore_errors=True)
+    os.replace(staging, target)
+
+    pointer = os.path.join(directory, f".{CURRENT_FILE}.{os.getpid()}.tmp")
+    with open(pointer, "w", encoding="utf-8") as f:
+        f.write(name)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(pointer, os.path.join(directory, CURRENT_FILE))
+
+    for entry in os.listdir(directory):
+        if entry.startswith("gen-") and entry != name:
+            shutil.rmtree(os.path.join(directory, entry), ignore_errors=True)
+    logger.info(f"Saved index snapshot {name}")
+
+
+def current_snapshot(directory):
+    """Return the name of the generation ``CURRENT`` points at, or ``None``."""
+    try:
+        with open(os.path.join(directory, CURRENT_FILE), encoding="utf-8") as f:
+            return f.read().strip() or None
+    except FileNotFoundError:
+        return None
+
+
+def acquire_builder_lock(directory):
+    """Try to become the one process building snapshots in ``directory``.
+
+    Returns the open lock file, which holds the lock until it is closed or
+    the process exits, or ``None`` if another process already holds it.
+    """
+    os.makedirs(directory, exist_ok=True)
+    lock = open(os.path.join(directory, LOCK_FILE), "a")
+    if fcntl is None:
+        return lock
+    try:
+        fcntl.flock(lock.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        lock.close()
+        return None
+    return lock
+
+
+def load_index(directory, signature, row_phrases=True, **derived):
+    """Return the current snapshot under ``directory`` or ``None``.
+
+    Arrays and strings are memory-mapped read-only, so loading costs little
+    more than parsing ``meta.json`` and processes on a host share one copy
+    of the index. ``row_phrases`` is only needed to rebuild the index and
+    readers skip it. ``derived`` is passed through to ``NLPIndex`` for parts
+    rebuilt from the snapshot (the scanner and vocabulary gate).
+    """
+    name = current_snapshot(directory)
+    if name is None:
+        return None
+    path = os.path.join(directory, name)
+    try:
+        with open(os.path.join(path, "meta.json"), encoding="utf-8") as f:
+            meta = json.load(f)
+    except FileNotFoundError:
+        return None
+
+    if meta.get("version") != FORMAT_VERSION or meta.get("signature") != signature:
+        logger.info(f"Ignoring index snapshot at {path} built with other settings")
+        return None
+
+    # The builder removes superseded generations, which a reader may race.
+    try:
+        keys = ARRAYS + tuple(
+            f"{key}_{part}" for key in STRING_TABLES for part in ("blob", "offsets")
+        )
+        arrays = {
+            key: np.load(os.path.join(path, f"{key}.npy"), mmap_mode="r")
+            for key in keys
+        }
+        for key in DENSE_ARRAYS:
+            if os.path.exists(os.path.join(path, f"{key}.npy")):
+                arrays[key] = np.load(os.path.join(path, f"{key}.npy"), mmap_mode="r")
+        rows = {}
+        if row_phrases:
+            with open(os.path.join(path, ROW_PHRASES_FILE), encoding="utf-8") as f:
+                rows = {key: tuple(value) for key, value in json.load(f).items()}
+    except FileNotFoundError:
+        return None
+    tables = {
+        key: StringTable(arrays[f"{key}_blob"], arrays[f"{key}_offsets"])
+        for key in STRING_TABLES
+    }
+    shape = tuple(meta["shape"])
+    if meta.get("hashed"):
+        vectorizer = HashedCharVectorizer(**meta["hashed"])
+    else:
+        # Set as if fitted: passing ``vocabulary`` would copy it into a dict.
+        vectorizer = TfidfVectorizer(dtype=np.float32)
+        vectorizer.vocabulary_ = StringMap(
+            tables["terms"], arrays["term_ids"], arrays["term_slots"]
+        )
+        vectorizer.fixed_vocabulary_ = True
+    vectorizer.idf_ = np.array(arrays["idf"])
+    tfidf_matrix = sparse.csr_matrix(
+        (
+            arrays["matrix_data"],
+            arrays["matrix_indices"],
+            arrays["matrix_indptr"],
+        ),
+        shape=shape,
+        copy=False,
+    )
+    postings = sparse.csc_matrix(
+        (
+            arrays["postings_data"],
+            arrays["postings_indices"],
+            arrays["postings_indptr"],
+        ),
+        shape=shape,
+        copy=False,
+    )
+    phrases = tables["phrases"]
+    return NLPIndex(
+        generation=meta["generation"],
+        vectorizer=vectorizer,
+        tfidf_matrix=tfidf_matrix,
+        phrases=phrases,
+        phrase_counts=arrays["phrase_counts"],
+        answers=tables["answers"],
+        answer_ids=arrays["answer_ids"],
+        answer_phrases=PhraseGroups(
+            phrases, arrays["answer_phrase_indptr"], arrays["answer_phrase_ids"]
+        ),
+        content_hash=meta["content_hash"],
+        row_phrases=rows,
+        postings=postings,
+        exact_phrases=StringMap(
+            tables["exact_keys"], arrays["exact_ids"], arrays["exact_slots"]
+        ),
+        embeddings=arrays.get("embeddings"),
+        projection=arrays.get("projection"),
+        **derived,
+    )
@@ -0,0 +1,128 @@
+import json
+import logging
+import os
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_KEY = "default"
+
+
+def load_knowledge_bases(path):
+    """Read the JSON map of ``"<guild>"``/``"<guild>/<channel>"`` to sources."""
+    if not path:
+        return {}
+    try:
+        with open(path, encoding="utf-8") as f:
+            mapping = json.load(f)
+    except FileNotFoundError:
+        logger.warning(f"Knowledge base map {path} not found")
+        return {}
+    return {str(key): str(spec) for key, spec in mapping.items()}
+
+
+class KnowledgeBaseCache:
+    """Per-guild NLP processors, loaded lazily and kept under a byte budget.
+
+    ``sources`` maps ``"<guild_id>"`` or ``"<guild_id>/<channel_id>"`` to a
+    knowledge source spec; anything else is answered by the default
+    processor, which is always resident. Other processors are created on
+    first use from their disk snapshot and dropped, least recently used
+    first, while the indexes held in memory exceed ``budget`` bytes. Their
+    snapshots stay on disk, so a cold guild reloads without rebuilding.
+    """
+
+    def __init__(
+        self,
+        factory,
+        sources,
+        budget: int,
+        snapshot_dir="",
+        on_load=None,
+        on_evict=None,
+    ):
+        self.factory = factory
+        self.sources = sources
+        self.budget = budget
+        self.snapshot_dir = snapshot_dir
+        self.on_load = on_load
+        self.on_evict = on_evict
+        self.stem_cache = None
+        self.text_cache = None
+        self.resident = OrderedDict()
+        self.loads = 0
+        self.evictions = 0
+        self.default = self._create(DEFAULT_KEY)
+
+    def _create(self, key):
+        snapshot_dir = self.snapshot_dir
+        if snapshot_dir and key != DEFAULT_KEY:
+            snapshot_dir = os.path.join(snapshot_dir, "guilds", key.replace("/", "-"))
+
+        kwargs = {"snapshot_dir": snapshot_dir}
+        if key != DEFAULT_KEY:
+            kwargs["source_spec"] = self.sources[key]
+        if self.stem_cache is not None:
+            kwargs["stem_cache"] = self.stem_cache
+            kwargs["text_cache"] = self.text_cache
+
+        processor = self.factory(**kwargs)
+        self.stem_cache = processor.stem_cache
+        self.text_cache = processor.text_cache
+        return processor
+
+    def resolve(self, guild_id=None, channel_id=None):
+        """Return the key of the knowledge base serving a guild channel."""
+        if guild_id is not None:
+            for key in (f"{guild_id}/{channel_id}", str(guild_id)):
+                if key in self.sources:
+                    return key
+        return DEFAULT_KEY
+
+    def get(self, key):
+        if key == DEFAULT_KEY:
+            return self.default
+
+        processor = self.resident.get(key)
+        if processor is not None:
+            self.resident.move_to_end(key)
+            return processor
+
+        processor = self._create(key)
+        self.resident[key] = processor
+        self.loads += 1
+        logger.info(f"Loaded knowledge base {key} ({len(processor.index)} phrases)")
+        if self.on_load is not None:
+            self.on_load(key, processor)
+        self.trim()
+        return processor
+
+    def items(self):
+        return [(DEFAULT_KEY, self.default), *self.resident.items()]
+
+    def processors(self):
+        return [processor for _, processor in self.items()]
+
+    def memory_bytes(self):
+        return sum(processor.index.memory_bytes() for processor in self.processors())
+
+    def trim(self):
+        """Evict cold knowledge bases until memory is back under budget."""
+        # The most recently used knowledge base is never evicted, even if it
+        # alone is over budget.
+        while len(self.resident) > 1 and self.memory_bytes() > self.budget:
+            key, processor = self.resident.popitem(last=False)
+            self.evictions += 1
+            logger.info(f"Evicted knowledge base {key}")
+            if self.on_evict is not None:
+                self.on_evict(key, processor)
+
+    def stats(self):
+        return {
+            "resident": len(self.resident) + 1,
+            "configured": len(self.sources) + 1,
+            "bytes": self.memory_bytes(),
+            "budget": self.budget,
+            "loads": self.loads,
+            "evictions": self.evictions,
+        }
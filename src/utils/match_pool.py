@@ -0,0 +1,145 @@
+import asyncio
+import concurrent.futures
+import logging
+import multiprocessing
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+MAX_REPLICAS = 64
+
+# Index replicas held by a worker process, keyed by snapshot directory.
+_replicas = OrderedDict()
+
+
+def _warm_up():
+    import src.utils.nlp_processor
+
+
+def _match_in_worker(snapshot_dir, generation, texts):
+    """Match ``texts`` against this worker's replica of a snapshot.
+
+    The replica is reloaded from disk when the parent has moved on to a
+    newer generation. Returns ``None`` if the snapshot on disk is still
+    older than ``generation`` so the parent can match in-process instead,
+    and otherwise the results with the counts the replica made matching
+    them, for the parent to add to its own.
+    """
+    from src.utils.nlp_processor import NLPProcessor
+
+    processor = _replicas.get(snapshot_dir)
+    if processor is None:
+        processor = NLPProcessor(
+            source_spec=None, snapshot_dir=snapshot_dir, role="reader"
+        )
+        _replicas[snapshot_dir] = processor
+        if len(_replicas) > MAX_REPLICAS:
+            _replicas.popitem(last=False)
+    else:
+        _replicas.move_to_end(snapshot_dir)
+
+    if processor.index.generation < generation:
+        processor.attach_snapshot()
+    if processor.index.generation < generation:
+        return None
+    before = processor.counters()
+    results = processor.find_best_matches(texts)
+    after = processor.counters()
+    return results, {key: after[key] - before[key] for key in after}
+
+
+class MatchPool:
+    """Run message matching in worker processes, off the event loop.
+
+    Each worker memory-maps the index snapshot of a knowledge base and keeps
+    it as a replica until the parent reports a newer generation. Batches
+    that miss ``deadline`` seconds are answered with no match, and batches
+    that would take more than ``max_pending`` messages in flight are shed.
+    Knowledge bases without a current snapshot are matched in-process.
+    """
+
+    def __init__(self, workers: int, deadline: float, max_pending: int):
+        self.workers = workers
+        self.deadline = deadline
+        self.max_pending = max_pending
+        self.executor = self._create_executor()
+        self.pending = 0
+        self.batches = 0
+        self.timeouts = 0
+        self.shed = 0
+        self.fallbacks = 0
+
+    def _create_executor(self):
+        # Spawned workers do not inherit the event loop or its threads.
+        executor = concurrent.futures.ProcessPoolExecutor(
+            max_workers=self.workers, mp_context=multiprocessing.get_context("spawn")
+        )
+        # Start every worker and import the NLP stack now rather than on the
+        # first message.
+        for _ in range(self.workers):
+            executor.submit(_warm_up)
+        return executor
+
+    async def match(self, processor, texts):
+        index = processor.index
+        if not processor.snapshot_dir or index.content_hash is None:
+            self.fallbacks += 1
+            return processor.find_best_matches(texts)
+
+        if self.pending + len(texts) > self.max_pending:
+            self.shed += 1
+            logger.warning(f"Match pool saturated, dropping {len(texts)} messages")
+            return [(None, 0)] * len(texts)
+
+        try:
+            future = asyncio.wrap_future(
+                self.executor.submit(
+                    _match_in_worker, processor.snapshot_dir, index.generation, texts
+                )
+            )
+        except concurrent.futures.BrokenExecutor:
+            logger.error("Match pool broke, starting new workers")
+            self.executor = self._create_executor()
+            self.fallbacks += 1
+            return processor.find_best_matches(texts)
+        # A batch that misses its deadline keeps a worker busy until it
+        # finishes, so it stays pending until then.
+        self.pending += len(texts)
+        future.add_done_callback(
+            lambda done: self._release(processor, done, len(texts))
+        )
+        self.batches += 1
+        try:
+            results = await asyncio.wait_for(asyncio.shield(future), self.deadline)
+        except asyncio.TimeoutError:
+            self.timeouts += 1
+            logger.warning(f"Matching {len(texts)} messages missed the deadline")
+            return [(None, 0)] * len(texts)
+        except Exception as e:
+            logger.error(f"Match worker failed, matching in-process: {e}")
+            results = None
+
+        if results is None:
+            self.fallbacks += 1
+            return processor.find_best_matches(texts)
+        return results[0]
+
+    def _release(self, processor, future, count):
+        self.pending -= count
+        # Counted here so batches that missed their deadline still count.
+        if not future.cancelled() and future.exception() is None:
+            if future.result() is not None:
+                processor.add_counters(future.result()[1])
+
+    def stats(self):
+        return {
+            "workers": self.workers,
+            "pending": self.pending,
+            "batches": self.batches,
+            "timeouts": self.timeouts,
+            "shed": self.shed,
+            "fallbacks": self.fallbacks,
+        }
+
+    def close(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
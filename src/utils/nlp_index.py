@@ -0,0 +1,383 @@
+import hashlib
+import sys
+import zlib
+from collections.abc import Mapping, Sequence
+from dataclasses import dataclass, field
+from typing import Any, Dict, Optional, Tuple, Union
+
+import numpy as np
+from sklearn.decomposition import TruncatedSVD
+from sklearn.feature_extraction.text import TfidfVectorizer
+
+from src.utils.aho_corasick import AhoCorasick
+from src.utils.vectorizers import HashedCharVectorizer
+
+
+@dataclass(frozen=True)
+class NLPIndex:
+    """Immutable snapshot of a fitted knowledge-base index.
+
+    A new instance is built for every refresh and published by replacing
+    ``NLPProcessor.index``; readers hold on to whichever snapshot they
+    grabbed, so a rebuild never mutates state a match is using.
+
+    Phrases are unique and integer-coded: ``answer_ids[phrase_id]`` indexes
+    the ``answers`` table, and ``answer_phrases[answer_id]`` lists every
+    trigger phrase configured for that answer. ``phrase_counts[phrase_id]``
+    is how often the phrase occurs in the source, which the IDF weights
+    count.
+
+    Indexes loaded from a snapshot hold their strings in memory-mapped
+    ``StringTable``, ``StringMap`` and ``PhraseGroups`` instead of tuples and
+    dicts, and leave out ``row_phrases`` unless they are going to be rebuilt.
+
+    With the LSA engine, ``projection`` maps TF-IDF vectors into a low-rank
+    dense space and ``embeddings`` holds every phrase there as an
+    L2-normalised float32 row; matching then scores all phrases densely
+    instead of walking ``postings``.
+    """
+
+    generation: int
+    vectorizer: Optional[Union[TfidfVectorizer, HashedCharVectorizer]]
+    tfidf_matrix: Any
+    phrases: Sequence
+    answers: Sequence
+    answer_ids: np.ndarray = field(default_factory=lambda: np.zeros(0, np.int32))
+    phrase_counts: np.ndarray = field(default_factory=lambda: np.zeros(0, np.int32))
+    answer_phrases: Sequence = ()
+    content_hash: Optional[str] = None
+    row_phrases: Dict[str, Tuple[str, ...]] = field(default_factory=dict)
+    postings: Any = None
+    exact_phrases: Mapping = field(default_factory=dict)
+    scanner: Optional[AhoCorasick] = None
+    gate: Optional["VocabularyGate"] = None
+    embeddings: Optional[np.ndarray] = None
+    projection: Optional[np.ndarray] = None
+    build_seconds: float = 0.0
+
+    @classmethod
+    def empty(cls, generation=0, content_hash=None):
+        return cls(generation, None, None, (), (), content_hash=content_hash)
+
+    def __len__(self):
+        return len(self.phrases)
+
+    def answer_for(self, phrase_id):
+        return self.answers[self.answer_ids[phrase_id]]
+
+    def memory_bytes(self):
+        """Approximate size of the index arrays, strings and vocabulary."""
+        total = self.answer_ids.nbytes + self.phrase_counts.nbytes
+        for array in (self.embeddings, self.projection):
+            if array is not None:
+                total += array.nbytes
+        for matrix in (self.tfidf_matrix, self.postings):
+            if matrix is not None:
+                total += matrix.data.nbytes + matrix.indices.nbytes
+                total += matrix.indptr.nbytes
+        for table in (self.phrases, self.answers):
+            if isinstance(table, StringTable):
+                total += table.nbytes
+            else:
+                total += sum(sys.getsizeof(text) for text in table)
+        idf = getattr(self.vectorizer, "idf_", None)
+        if idf is not None:
+            total += idf.nbytes
+        vocabulary = getattr(self.vectorizer, "vocabulary_", None)
+        if isinstance(vocabulary, StringMap):
+            total += vocabulary.nbytes
+        elif vocabulary is not None:
+            total += sys.getsizeof(vocabulary)
+            total += sum(sys.getsizeof(term) for term in vocabulary)
+        return total
+
+    def top_k(self, message_vector, k=1):
+        """Return up to ``k`` ``(phrase_id, score)`` pairs, best first.
+
+        ``postings`` is the column-major copy of the L2-normalised TF-IDF
+        matrix, so each message term maps straight to the phrases containing
+        it and only those candidates are scored. Ties go to the lowest
+        phrase id, matching ``np.argmax`` over the dense similarities.
+        """
+        if self.postings is None or not message_vector.nnz:
+            return []
+        if self.embeddings is not None:
+            scores = self.embeddings @ self.embed(message_vector)[0]
+            return _select_top_k(np.arange(len(scores)), scores, k)
+
+        indptr = self.postings.indptr
+        ids = []
+        weights = []
+        for term, value in zip(message_vector.indices, message_vector.data):
+            start, end = indptr[term], indptr[term + 1]
+            ids.append(self.postings.indices[start:end])
+            weights.append(self.postings.data[start:end] * value)
+
+        candidates, inverse = np.unique(np.concatenate(ids), return_inverse=True)
+        scores = np.bincount(inverse, weights=np.concatenate(weights))
+        return _select_top_k(candidates, scores, k)
+
+    def top_k_batch(self, message_matrix, k=1):
+        """Rank phrases for every row of ``message_matrix`` in one product."""
+        if self.postings is None:
+            return [[] for _ in range(message_matrix.shape[0])]
+        if self.embeddings is not None:
+            similarities = self.embed(message_matrix) @ self.embeddings.T
+            phrase_ids = np.arange(similarities.shape[1])
+            return [
+                _select_top_k(phrase_ids, scores, k) if terms else []
+                for scores, terms in zip(similarities, np.diff(message_matrix.indptr))
+            ]
+
+        similarities = (message_matrix @ self.postings.T).tocsr()
+        results = []
+        for row in range(similarities.shape[0]):
+            start, end = similarities.indptr[row], similarities.indptr[row + 1]
+            results.append(
+                _select_top_k(
+                    similarities.indices[start:end], similarities.data[start:end], k
+                )
+            )
+        return results
+
+    def embed(self, message_matrix):
+        """Project TF-IDF rows into the LSA space as unit-length float32 rows."""
+        return normalize_rows(message_matrix @ self.projection)
+
+
+class StringTable(Sequence):
+    """Read-only sequence of strings kept as one UTF-8 blob and its offsets.
+
+    String ``i`` is ``blob[offsets[i]:offsets[i + 1]]``, decoded on access.
+    Snapshots memory-map both arrays, so every process on a host shares a
+    single copy of the text instead of holding its own ``str`` objects.
+    """
+
+    def __init__(self, blob, offsets):
+        self.blob = blob
+        self.offsets = offsets
+        # Memoryviews index far faster than numpy arrays, one item at a time.
+        self._blob = memoryview(blob)
+        self._offsets = memoryview(offsets)
+
+    @classmethod
+    def build(cls, strings):
+        encoded = [text.encode("utf-8") for text in strings]
+        offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        np.cumsum([len(data) for data in encoded], out=offsets[1:])
+        return cls(np.frombuffer(b"".join(encoded), dtype=np.uint8), offsets)
+
+    def __len__(self):
+        return len(self._offsets) - 1
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(len(self)))]
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError("string table index out of range")
+        return str(self.encoded(i), "utf-8")
+
+    def encoded(self, i):
+        return self._blob[self._offsets[i] : self._offsets[i + 1]]
+
+    @property
+    def nbytes(self):
+        return self.blob.nbytes + self.offsets.nbytes
+
+
+class StringMap(Mapping):
+    """Read-only map from strings to integers, stored as flat arrays.
+
+    ``values[i]`` belongs to ``keys[i]``, and ``slots`` is an open-addressing
+    hash table of key positions (-1 when empty) keyed by the CRC-32 of the
+    UTF-8 key, which unlike ``hash`` is the same in every process. Lookups
+    therefore work straight from a memory-mapped snapshot.
+    """
+
+    def __init__(self, keys, values, slots):
+        self.keys_table = keys
+        self.values_array = values
+        self.slots = slots
+        self._values = memoryview(values)
+        self._slots = memoryview(slots)
+        self._mask = len(slots) - 1
+
+    @classmethod
+    def build(cls, mapping):
+        keys = list(mapping)
+        slots = np.full(1 << (2 * len(keys)).bit_length(), -1, dtype=np.int32)
+        mask = len(slots) - 1
+        for position, key in enumerate(keys):
+            slot = zlib.crc32(key.encode("utf-8")) & mask
+            while slots[slot] >= 0:
+                slot = (slot + 1) & mask
+            slots[slot] = position
+        return cls(
+            StringTable.build(keys),
+            np.array([mapping[key] for key in keys], dtype=np.int32),
+            slots,
+        )
+
+    def __getitem__(self, key):
+        data = key.encode("utf-8")
+        slot = zlib.crc32(data) & self._mask
+        while True:
+            position = self._slots[slot]
+            if position < 0:
+                raise KeyError(key)
+            if self.keys_table.encoded(position) == data:
+                return self._values[position]
+            slot = (slot + 1) & self._mask
+
+    def __iter__(self):
+        return iter(self.keys_table)
+
+    def __len__(self):
+        return len(self.keys_table)
+
+    @property
+    def nbytes(self):
+        return self.keys_table.nbytes + self.values_array.nbytes + self.slots.nbytes
+
+
+class PhraseGroups(Sequence):
+    """The trigger phrases of each answer, stored as ragged phrase ids."""
+
+    def __init__(self, phrases, indptr, phrase_ids):
+        self.phrases = phrases
+        self.indptr = indptr
+        self.phrase_ids = phrase_ids
+
+    @classmethod
+    def build(cls, phrases, groups):
+        phrase_ids = {phrase: i for i, phrase in enumerate(phrases)}
+        indptr = np.zeros(len(groups) + 1, dtype=np.int64)
+        np.cumsum([len(group) for group in groups], out=indptr[1:])
+        ids = [phrase_ids[phrase] for group in groups for phrase in group]
+        return cls(phrases, indptr, np.array(ids, dtype=np.int32))
+
+    def __len__(self):
+        return len(self.indptr) - 1
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(len(self)))]
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError("phrase group index out of range")
+        ids = self.phrase_ids[self.indptr[i] : self.indptr[i + 1]]
+        return tuple(self.phrases[phrase_id] for phrase_id in ids)
+
+
+def _select_top_k(candidates, scores, k):
+    if not len(scores):
+        return []
+    if k < len(scores):
+        cutoff = scores[np.argpartition(-scores, k - 1)[k - 1]]
+        selected = np.flatnonzero(scores >= cutoff)
+    else:
+        selected = np.arange(len(scores))
+    order = np.lexsort((candidates[selected], -scores[selected]))[:k]
+    return [(int(candidates[i]), float(scores[i])) for i in selected[order]]
+
+
+class VocabularyGate:
+    """Cheap pre-stemming check that a message shares a term with the index.
+
+    Porter stems keep the first three characters of the word (two for stems
+    shorter than four characters), apart from the stemmer's irregular forms,
+    so comparing token prefixes against the vocabulary's stem prefixes never
+    rejects a message that could match.
+    """
+
+    def __init__(self, stems, irregular_forms):
+        self.prefixes = frozenset(
+            stem[:3] if len(stem) >= 4 else stem[:2] for stem in stems
+        )
+        self.irregular = frozenset(
+            word for word, stem in irregular_forms.items() if stem in stems
+        )
+
+    def admits(self, tokens):
+        prefixes = self.prefixes
+        for token in tokens:
+            if (
+                token[:3] in prefixes
+                or token[:2] in prefixes
+                or token[:1] in prefixes
+                or token in self.irregular
+            ):
+                return True
+        return False
+
+
+def lsa_projection(tfidf_matrix, components):
+    """Fit a truncated SVD of the phrase matrix and return its term projection.
+
+    The result is a ``(terms, components)`` float32 array, or ``None`` when
+    the index is too small to reduce.
+    """
+    components = min(components, min(tfidf_matrix.shape) - 1)
+    if components < 1:
+        return None
+    svd = TruncatedSVD(n_components=components, random_state=0)
+    svd.fit(tfidf_matrix)
+    return np.ascontiguousarray(svd.components_.T, dtype=np.float32)
+
+
+def normalize_rows(matrix):
+    matrix = np.asarray(matrix, dtype=np.float32)
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1
+    return matrix / norms
+
+
+def normalize_phrase(text):
+    return " ".join(text.lower().split()).strip(".,!?;: ")
+
+
+def exact_phrase_map(raw_phrases, tfidf_matrix):
+    """Map each normalized trigger phrase to the phrase id TF-IDF would pick.
+
+    ``raw_phrases`` holds ``(normalized_phrase, phrase_id)`` pairs. Phrases
+    with identical TF-IDF rows tie at a cosine of 1.0 and ``top_k`` resolves
+    ties to the lowest id, so every phrase maps to the first row sharing its
+    vector. Phrases with an empty vector can never match and are left out.
+    """
+    first_row = {}
+    canonical = {}
+    exact_phrases = {}
+    for raw_phrase, phrase_id in raw_phrases:
+        if raw_phrase in exact_phrases:
+            continue
+        if phrase_id not in canonical:
+            start = tfidf_matrix.indptr[phrase_id]
+            end = tfidf_matrix.indptr[phrase_id + 1]
+            vector = (
+                tfidf_matrix.indices[start:end].tobytes(),
+                tfidf_matrix.data[start:end].tobytes(),
+            )
+            canonical[phrase_id] = (
+                first_row.setdefault(vector, phrase_id) if start < end else None
+            )
+        if canonical[phrase_id] is not None:
+            exact_phrases[raw_phrase] = canonical[phrase_id]
+    return exact_phrases
+
+
+def phrase_scanner(phrases, min_tokens):
+    patterns = {}
+    for phrase_id, phrase in enumerate(phrases):
+        tokens = tuple(phrase.split())
+        if len(tokens) >= min_tokens:
+            patterns.setdefault(tokens, (len(tokens), phrase_id))
+    return AhoCorasick(patterns.items())
+
+
+def content_hash(data):
+    if isinstance(data, str):
+        data = data.encode("utf-8")
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
@@ -1,94 +1,649 @@
+import asyncio
+import dataclasses
 import logging
-import pandas as pd
+import sys
+import threading
+import time
+
 import numpy as np
-from nltk.tokenize import word_tokenize
 from nltk.corpus import stopwords
 from nltk.stem import PorterStemmer
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.metrics.pairwise import cosine_similarity
 
-from src.config.settings import GOOGLE_SHEET_URL
+from src.config.settings import (
+    GOOGLE_SHEET_URL,
+    HASH_FEATURES,
+    INDEX_ROLE,
+    INDEX_SNAPSHOT_DIR,
+    KEYWORD_SCAN,
+    KEYWORD_SCAN_MIN_TOKENS,
+    KEYWORD_SCAN_SCORE,
+    KNOWLEDGE_SOURCE,
+    KNOWLEDGE_TABLE,
+    LSA_COMPONENTS,
+    MATCH_ENGINE,
+    RESULT_CACHE_SIZE,
+    RESULT_CACHE_TTL,
+    SHEET_FETCH_BACKOFF,
+    SHEET_FETCH_RETRIES,
+    SHEET_FETCH_TIMEOUT,
+    STEM_CACHE_SIZE,
+    TEXT_CACHE_SIZE,
+    TOKENIZER_BACKEND,
+    VECTORIZER_MODE,
+)
+from src.utils.cache import LRUCache, TTLCache
+from src.utils.index_store import (
+    acquire_builder_lock,
+    current_snapshot,
+    load_index,
+    save_index,
+)
+from src.utils.nlp_index import (
+    NLPIndex,
+    VocabularyGate,
+    content_hash,
+    exact_phrase_map,
+    lsa_projection,
+    normalize_phrase,
+    normalize_rows,
+    phrase_scanner,
+)
+from src.utils.sources import SnapshotWatcher, get_source
+from src.utils.tokenizers import get_tokenizer
+from src.utils.vectorizers import get_vectorizer
 
 logger = logging.getLogger(__name__)
 
 
 class NLPProcessor:
-    def __init__(self):
-        self.vectorizer = TfidfVectorizer()
-        self.tfidf_matrix = None
-        self.all_phrases = []
-        self.answer_map = []
-        self.stop_words = set(stopwords.words("english"))
-        self.stemmer = PorterStemmer()
-        self.process_data()
+    def __init__(
+        self,
+        source_spec=KNOWLEDGE_SOURCE,
+        snapshot_dir=INDEX_SNAPSHOT_DIR,
+        stem_cache=None,
+        text_cache=None,
+        role=INDEX_ROLE,
+    ):
+        # Stems and preprocessed texts do not depend on the knowledge base,
+        # so processors for different guilds can share these caches.
+        if stem_cache is None:
+            stem_cache = LRUCache(STEM_CACHE_SIZE)
+        if text_cache is None:
+            text_cache = LRUCache(TEXT_CACHE_SIZE)
+        self.stem_cache = stem_cache
+        self.text_cache = text_cache
+        self.result_cache = TTLCache(RESULT_CACHE_SIZE, RESULT_CACHE_TTL)
+        self.result_cache_generation = None
+        self.gate_checked = 0
+        self.gate_rejected = 0
+        # Assigned directly: going through the setters would wipe the shared
+        # caches every time another guild's processor is created.
+        self._tokenizer = get_tokenizer(TOKENIZER_BACKEND)
+        self._stop_words = frozenset(stopwords.words("english"))
+        self._stemmer = PorterStemmer()
+        self.source = get_source(
+            source_spec,
+            GOOGLE_SHEET_URL,
+            KNOWLEDGE_TABLE,
+            timeout=SHEET_FETCH_TIMEOUT,
+            retries=SHEET_FETCH_RETRIES,
+            backoff=SHEET_FETCH_BACKOFF,
+        )
+        self.snapshot_dir = snapshot_dir
+        self.role = role
+        self.builder_lock = None
+        self.reader = self._claim_role(role)
+        self.snapshot_watcher = SnapshotWatcher(snapshot_dir) if self.reader else None
+        self._build_lock = threading.Lock()
+        self.snapshot_name = current_snapshot(snapshot_dir) if snapshot_dir else None
+        self.index = self.load_snapshot() or NLPIndex.empty()
+        self.last_refresh = time.time()
+
+    def _claim_role(self, role):
+        """Return whether this process only reads another's snapshots.
+
+        With ``auto``, the first process to lock the snapshot directory
+        builds the index and every other process on the host attaches to
+        the snapshots it publishes.
+        """
+        if not self.snapshot_dir or role == "builder":
+            return False
+        if role == "reader":
+            return True
+        self.builder_lock = acquire_builder_lock(self.snapshot_dir)
+        if self.builder_lock is None:
+            logger.info("Reading index snapshots built by another process")
+            return True
+        return False
+
+    def _take_over(self):
+        """Start building if an ``auto`` reader finds the builder lock free.
+
+        The lock is released when the builder exits, so without this the
+        readers would keep serving its last snapshot forever.
+        """
+        if self.role != "auto":
+            return False
+        self.builder_lock = acquire_builder_lock(self.snapshot_dir)
+        if self.builder_lock is None:
+            return False
+        logger.info("Index builder has gone, building snapshots here instead")
+        self.reader = False
+        return True
+
+    @property
+    def watched(self):
+        """What to watch for changes, or ``None`` if it has to be polled.
+
+        Readers watch the snapshots the builder publishes and builders a
+        local knowledge source.
+        """
+        if self.reader:
+            return self.snapshot_watcher
+        if self.source is not None and self.source.paths:
+            return self.source
+        return None
+
+    @property
+    def tokenizer(self):
+        return self._tokenizer
+
+    @tokenizer.setter
+    def tokenizer(self, value):
+        if value != self._tokenizer:
+            self._tokenizer = value
+            self.clear_caches()
+
+    @property
+    def stop_words(self):
+        return self._stop_words
+
+    @stop_words.setter
+    def stop_words(self, value):
+        if value != self._stop_words:
+            self._stop_words = value
+            self.clear_caches()
+
+    @property
+    def stemmer(self):
+        return self._stemmer
+
+    @stemmer.setter
+    def stemmer(self, value):
+        if value != self._stemmer:
+            self._stemmer = value
+            self.clear_caches()
+
+    def clear_caches(self):
+        self.stem_cache.clear()
+        self.text_cache.clear()
+
+    def cache_stats(self):
+        return {
+            "stems": self.stem_cache.stats(),
+            "texts": self.text_cache.stats(),
+            "results": self.result_cache.stats(),
+        }
+
+    def counters(self):
+        """Return the running match counts that ``!status`` reports."""
+        counters = {
+            "gate_checked": self.gate_checked,
+            "gate_rejected": self.gate_rejected,
+        }
+        for name, cache in self._counted_caches():
+            counters[f"{name}_hits"] = cache.hits
+            counters[f"{name}_misses"] = cache.misses
+        return counters
+
+    def add_counters(self, counts):
+        """Add counts made while matching for this processor elsewhere.
+
+        Worker processes match against replicas of the index, whose caches
+        and gate counters the parent would otherwise never see.
+        """
+        self.gate_checked += counts["gate_checked"]
+        self.gate_rejected += counts["gate_rejected"]
+        for name, cache in self._counted_caches():
+            with cache.lock:
+                cache.hits += counts[f"{name}_hits"]
+                cache.misses += counts[f"{name}_misses"]
+
+    def _counted_caches(self):
+        return (
+            ("stems", self.stem_cache),
+            ("texts", self.text_cache),
+            ("results", self.result_cache),
+        )
+
+    @property
+    def generation(self):
+        return self.index.generation
+
+    def stem(self, word):
+        stemmed = self.stem_cache.get(word)
+        if stemmed is None:
+            stemmed = self._stemmer.stem(word)
+            self.stem_cache.put(word, stemmed)
+        return stemmed
 
     def preprocess_text(self, text):
-        tokens = word_tokenize(text.lower())
+        preprocessed = self.text_cache.get(text)
+        if preprocessed is not None:
+            return preprocessed
+
+        tokens = self._tokenizer(text.lower())
         tokens = [
-            self.stemmer.stem(word)
+            self.stem(word)
             for word in tokens
-            if word.isalnum() and word not in self.stop_words
+            if word.isalnum() and word not in self._stop_words
         ]
-        return " ".join(tokens)
+        preprocessed = " ".join(tokens)
+        self.text_cache.put(text, preprocessed)
+        return preprocessed
 
-    def load_data(self):
-        try:
-            if not GOOGLE_SHEET_URL:
-                logger.warning("Google Sheet ID is not set")
-                return []
-
-            data = pd.read_csv(GOOGLE_SHEET_URL)
+    def load_data(self, raw, previous_hash=None):
+        """Parse raw source content and return ``(rows, content_hash)``.
 
-            if data.shape[1] < 2:
-                logger.warning("Invalid data format in the Google Sheet")
-                return []
+        ``rows`` is ``None`` when the content hashes to ``previous_hash`` or
+        cannot be parsed, so callers keep their current index.
+        """
+        if raw is None:
+            logger.warning("No knowledge source is configured")
+            return [], None
 
-            data = data.dropna(subset=[data.columns[1]])
+        try:
+            digest = content_hash(raw)
+            if previous_hash is not None and digest == previous_hash:
+                logger.info(f"{self.source.name} unchanged since last refresh")
+                return None, digest
 
-            sheet_data = data.iloc[:, 0:2].values.tolist()
-            logger.info(f"Loaded {len(sheet_data)} records from Google Sheet")
-            return sheet_data
+            sheet_data = self.source.parse(raw)
+            logger.info(f"Loaded {len(sheet_data)} records from {self.source.name}")
+            return sheet_data, digest
         except Exception as e:
-            logger.error(f"Error loading data from Google Sheet: {e}")
-            return []
+            logger.error(f"Error parsing data from {self.source.name}: {e}")
+            # Make the next read return the content again instead of
+            # reporting it unchanged while it was never indexed.
+            self.source.reset()
+            return None, previous_hash
 
-    def process_data(self):
-        sheet_data = self.load_data()
-        self.all_phrases = []
-        self.answer_map = []
+    def build_index(self, sheet_data, generation, previous=None, digest=None):
+        started = time.perf_counter()
+        previous = previous or NLPIndex.empty()
+        phrase_ids = {}
+        answer_table = {}
+        answer_ids = []
+        grouped = []
+        raw_phrases = []
+        row_phrases = {}
+        reused = 0
 
         for row in sheet_data:
             keywords, answer = row
-            for keyword in str(keywords).split(","):
-                keyword = keyword.strip()
-                if keyword:
-                    preprocessed = self.preprocess_text(keyword)
-                    self.all_phrases.append(preprocessed)
-                    self.answer_map.append(answer)
-
-        if self.all_phrases:
-            self.tfidf_matrix = self.vectorizer.fit_transform(self.all_phrases)
-            logger.info("NLP model updated with new data")
+            keywords = str(keywords)
+            row_hash = content_hash(keywords)
+            row_keywords = row_phrases.get(row_hash)
+            if row_keywords is None:
+                row_keywords = previous.row_phrases.get(row_hash)
+                if row_keywords is None:
+                    row_keywords = tuple(
+                        self.preprocess_text(keyword.strip())
+                        for keyword in keywords.split(",")
+                        if keyword.strip()
+                    )
+                else:
+                    reused += 1
+                row_phrases[row_hash] = row_keywords
+            if not row_keywords:
+                continue
+
+            answer_id = answer_table.setdefault(
+                sys.intern(str(answer)), len(answer_table)
+            )
+            if answer_id == len(grouped):
+                grouped.append({})
+            raw_keywords = [
+                normalize_phrase(keyword)
+                for keyword in keywords.split(",")
+                if keyword.strip()
+            ]
+            for raw_phrase, phrase in zip(raw_keywords, row_keywords):
+                phrase_id = phrase_ids.setdefault(phrase, len(phrase_ids))
+                if phrase_id == len(answer_ids):
+                    answer_ids.append(answer_id)
+                grouped[answer_id][phrase] = None
+                raw_phrases.append((raw_phrase, phrase_id))
+
+        if not phrase_ids:
+            return NLPIndex.empty(generation, digest)
+
+        phrases = tuple(phrase_ids)
+        occurrences = np.array(
+            [phrase_id for _, phrase_id in raw_phrases], dtype=np.int32
+        )
+        phrase_counts = np.bincount(occurrences, minlength=len(phrases))
+        phrase_counts = phrase_counts.astype(np.int32)
+        # IDF weights only depend on how often each phrase occurs.
+        same_documents = dict(zip(phrases, phrase_counts.tolist())) == dict(
+            zip(previous.phrases, previous.phrase_counts.tolist())
+        )
+        if same_documents and phrases == tuple(previous.phrases):
+            # Only answers changed; the fitted model is still exact.
+            vectorizer = previous.vectorizer
+            tfidf_matrix = previous.tfidf_matrix
+            postings = previous.postings
+            projection = previous.projection
+        elif same_documents:
+            # The same phrases in a new order keep identical IDF weights.
+            vectorizer = previous.vectorizer
+            tfidf_matrix = vectorizer.transform(phrases)
+            postings = tfidf_matrix.tocsc()
+            projection = previous.projection
+        else:
+            # IDF counts every occurrence of a phrase, as separate rows in the
+            # sheet would, but the index keeps one row per unique phrase.
+            vectorizer = get_vectorizer(VECTORIZER_MODE, HASH_FEATURES)
+            first_rows = np.unique(occurrences, return_index=True)[1]
+            tfidf_matrix = vectorizer.fit_transform(
+                [phrases[phrase_id] for phrase_id in occurrences]
+            )[first_rows]
+            postings = tfidf_matrix.tocsc()
+            projection = None
+
+        embeddings = None
+        if MATCH_ENGINE == "lsa":
+            if projection is None:
+                projection = lsa_projection(tfidf_matrix, LSA_COMPONENTS)
+            if projection is not None:
+                embeddings = normalize_rows(tfidf_matrix @ projection)
+        else:
+            projection = None
+
+        logger.debug(f"Reused preprocessed keywords for {reused} unchanged rows")
+        return NLPIndex(
+            generation=generation,
+            vectorizer=vectorizer,
+            tfidf_matrix=tfidf_matrix,
+            phrases=phrases,
+            phrase_counts=phrase_counts,
+            answers=tuple(answer_table),
+            answer_ids=np.array(answer_ids, dtype=np.int32),
+            answer_phrases=tuple(tuple(group) for group in grouped),
+            content_hash=digest,
+            row_phrases=row_phrases,
+            postings=postings,
+            exact_phrases=exact_phrase_map(raw_phrases, tfidf_matrix),
+            embeddings=embeddings,
+            projection=projection,
+            build_seconds=time.perf_counter() - started,
+            **self._derived_parts(phrases),
+        )
+
+    def _derived_parts(self, phrases):
+        return {
+            "scanner": (
+                phrase_scanner(phrases, KEYWORD_SCAN_MIN_TOKENS)
+                if KEYWORD_SCAN
+                else None
+            ),
+            "gate": self._vocabulary_gate(phrases),
+        }
+
+    def snapshot_signature(self):
+        """Identify the preprocessing settings a snapshot was built with."""
+        signature = f"{TOKENIZER_BACKEND}:{type(self._stemmer).__name__}"
+        if VECTORIZER_MODE == "hashed":
+            signature += f":hashed-{HASH_FEATURES}"
+        if MATCH_ENGINE == "lsa":
+            signature += f":lsa-{LSA_COMPONENTS}"
+        return signature
+
+    def load_snapshot(self):
+        if not self.snapshot_dir:
+            return None
+        try:
+            index = load_index(
+                self.snapshot_dir,
+                self.snapshot_signature(),
+                row_phrases=not self.reader,
+            )
+            if index is None:
+                return None
+            index = dataclasses.replace(index, **self._derived_parts(index.phrases))
+        except Exception as e:
+            logger.error(f"Error loading index snapshot: {e}")
+            return None
+
+        logger.info(
+            f"Loaded index snapshot with {len(index)} trigger phrases "
+            f"(generation {index.generation})"
+        )
+        return index
+
+    def attach_snapshot(self):
+        """Switch to the newest snapshot published in ``snapshot_dir``."""
+        name = current_snapshot(self.snapshot_dir)
+        if name is None or name == self.snapshot_name:
+            return self.index
+        index = self.load_snapshot()
+        if index is not None:
+            self.index = index
+            self.snapshot_name = name
+        return self.index
+
+    def save_snapshot(self, index):
+        if not self.snapshot_dir or not len(index):
+            return
+        try:
+            save_index(index, self.snapshot_dir, self.snapshot_signature())
+        except Exception as e:
+            logger.error(f"Error saving index snapshot: {e}")
+
+    def _vocabulary_gate(self, phrases):
+        # Character n-grams match misspelled words the gate would reject.
+        if VECTORIZER_MODE == "hashed" or not isinstance(self._stemmer, PorterStemmer):
+            return None
+        stems = {token for phrase in phrases for token in phrase.split()}
+        return VocabularyGate(stems, getattr(self._stemmer, "pool", {}))
+
+    def could_match(self, index, message_text):
+        """Reject messages sharing no vocabulary with ``index`` before stemming."""
+        self.gate_checked += 1
+        if index.gate is None:
+            return True
+        if len(message_text.strip()) >= 2:
+            tokens = [
+                token
+                for token in self._tokenizer(message_text.lower())
+                if token.isalnum() and token not in self._stop_words
+            ]
+            if index.gate.admits(tokens):
+                return True
+        self.gate_rejected += 1
+        return False
+
+    def process_data(self, raw):
+        """Rebuild the index from raw source content unless it is unchanged.
+
+        ``raw`` is ``None`` when no source is configured, which resets the
+        index. The current index is kept if parsing or building fails.
+        """
+        with self._build_lock:
+            previous = self.index
+            sheet_data, digest = self.load_data(raw, previous.content_hash)
+            if sheet_data is None:
+                return previous
+
+            try:
+                index = self.build_index(
+                    sheet_data, previous.generation + 1, previous, digest
+                )
+            except Exception as e:
+                logger.error(f"Error building NLP index, keeping current one: {e}")
+                self.source.reset()
+                return previous
+            self.index = index
+            self.save_snapshot(index)
+
+        if len(index):
+            logger.info(
+                f"NLP model updated with new data (generation {index.generation})"
+            )
         else:
-            self.tfidf_matrix = None
             logger.info("NLP model reset - no data available")
+        return index
+
+    async def fetch_data(self):
+        """Read the knowledge source, or ``None`` if it has not changed."""
+        return await self.source.read()
+
+    async def refresh(self):
+        """Read the knowledge source and rebuild the index in a worker thread.
+
+        A failed read keeps the current index; unchanged content (a 304 for
+        the sheet, an untouched file) is never parsed.
+        """
+        if self.reader and not self._take_over():
+            return await asyncio.to_thread(self.attach_snapshot)
+
+        raw = None
+        if self.source is not None:
+            try:
+                raw = await self.fetch_data()
+            except Exception as e:
+                logger.error(f"Error loading data from {self.source.name}: {e}")
+                return self.index
+            if raw is None:
+                logger.info(f"{self.source.name} not modified since last refresh")
+                return self.index
+        return await asyncio.to_thread(self.process_data, raw)
+
+    async def close(self):
+        if self.source is not None:
+            await self.source.close()
+        if self.builder_lock is not None:
+            self.builder_lock.close()
+            self.builder_lock = None
+
+    def _cached_result(self, index, preprocessed_message):
+        if self.result_cache_generation != index.generation:
+            self.result_cache.clear()
+            self.result_cache_generation = index.generation
+        return self.result_cache.get(preprocessed_message)
+
+    def _threshold(self, index, matches, preprocessed_message):
+        best = matches[0] if matches else None
+        if index.scanner is not None and (best is None or best[1] < KEYWORD_SCAN_SCORE):
+            # A trigger phrase contained verbatim in a longer message is
+            # scored at least KEYWORD_SCAN_SCORE, preferring the longest.
+            hits = index.scanner.search(preprocessed_message.split())
+            if hits:
+                _, phrase_id = max(hits, key=lambda hit: (hit[0], -hit[1]))
+                best = (phrase_id, KEYWORD_SCAN_SCORE)
+
+        if best and best[1] > 0.25:
+            phrase_id, score = best
+            return index.answer_for(phrase_id), score
+        return None, 0
+
+    def find_top_matches(self, message_text, k=5):
+        index = self.index
+        if not len(index):
+            return []
+
+        preprocessed_message = self.preprocess_text(message_text)
+        message_vector = index.vectorizer.transform([preprocessed_message])
+        return [
+            (index.answer_for(phrase_id), score)
+            for phrase_id, score in index.top_k(message_vector, k)
+        ]
+
+    def find_relevant_answers(self, message_text, k=5):
+        """Return up to ``k`` ``(answer, trigger_phrases, score)`` tuples.
+
+        Answers are ranked by their best-scoring trigger phrase; answers with
+        no phrase related to the message are left out.
+        """
+        index = self.index
+        if not len(index):
+            return []
+
+        preprocessed_message = self.preprocess_text(message_text)
+        message_vector = index.vectorizer.transform([preprocessed_message])
+        answers = {}
+        for phrase_id, score in index.top_k(message_vector, len(index)):
+            if score <= 0:
+                break
+            answers.setdefault(int(index.answer_ids[phrase_id]), score)
+            if len(answers) == k:
+                break
+        return [
+            (index.answers[answer_id], index.answer_phrases[answer_id], score)
+            for answer_id, score in answers.items()
+        ]
 
     def find_best_match(self, message_text):
-        if not self.all_phrases:
+        index = self.index
+        if not len(index):
             logger.warning("No data loaded for NLP processing")
             return None, 0
 
+        phrase_id = index.exact_phrases.get(normalize_phrase(message_text))
+        if phrase_id is not None:
+            return index.answer_for(phrase_id), 1.0
+        if not self.could_match(index, message_text):
+            return None, 0
+
         preprocessed_message = self.preprocess_text(message_text)
-        message_vector = self.vectorizer.transform([preprocessed_message])
+        cached = self._cached_result(index, preprocessed_message)
+        if cached is not None:
+            return cached
 
-        similarities = cosine_similarity(message_vector, self.tfidf_matrix)
-        best_match_idx = np.argmax(similarities[0])
-        similarity_score = similarities[0][best_match_idx]
+        message_vector = index.vectorizer.transform([preprocessed_message])
+        matches = index.top_k(message_vector, 1)
 
         logger.debug(
-            f"Query: '{message_text}', Best match score: {similarity_score:.2f}"
+            f"Query: '{message_text}', "
+            f"Best match score: {matches[0][1] if matches else 0.0:.2f}"
         )
 
-        if similarity_score > 0.25:
-            return self.answer_map[best_match_idx], similarity_score
-        return None, 0
+        result = self._threshold(index, matches, preprocessed_message)
+        self.result_cache.put(preprocessed_message, result)
+        return result
+
+    def find_best_matches(self, texts):
+        """Batch form of ``find_best_match`` using a single transform and product."""
+        index = self.index
+        if not len(index):
+            logger.warning("No data loaded for NLP processing")
+            return [(None, 0)] * len(texts)
+
+        results = []
+        misses = {}
+        for position, text in enumerate(texts):
+            phrase_id = index.exact_phrases.get(normalize_phrase(text))
+            if phrase_id is not None:
+                results.append((index.answer_for(phrase_id), 1.0))
+                continue
+            if not self.could_match(index, text):
+                results.append((None, 0))
+                continue
+
+            preprocessed_message = self.preprocess_text(text)
+            cached = self._cached_result(index, preprocessed_message)
+            results.append(cached)
+            if cached is None:
+                misses.setdefault(preprocessed_message, []).append(position)
+
+        if misses:
+            message_matrix = index.vectorizer.transform(list(misses))
+            batch = index.top_k_batch(message_matrix, 1)
+            for (preprocessed_message, positions), matches in zip(
+                misses.items(), batch
+            ):
+                result = self._threshold(index, matches, preprocessed_message)
+                self.result_cache.put(preprocessed_message, result)
+                for position in positions:
+                    results[position] = result
+        return results
@@ -0,0 +1,242 @@
+import abc
+import asyncio
+import csv
+import io
+import json
+import logging
+import os
+import sqlite3
+
+from src.utils.fetcher import ConditionalFetcher
+from src.utils.index_store import CURRENT_FILE
+
+logger = logging.getLogger(__name__)
+
+SHEET_EXPORT_URL = "https://docs.google.com/spreadsheets/d/{}/export?format=csv"
+
+
+def parse_csv(raw):
+    """Return ``(keywords, answer)`` pairs from the first two CSV columns.
+
+    The header row is skipped and rows without an answer are dropped.
+    """
+    reader = csv.reader(io.StringIO(raw.decode("utf-8-sig"), newline=""))
+    header = next(reader, None)
+    if header is None or len(header) < 2:
+        logger.warning("Invalid data format in the knowledge source")
+        return []
+    return [(row[0], row[1]) for row in reader if len(row) >= 2 and row[1]]
+
+
+def parse_jsonl(raw):
+    """Return pairs from JSON lines holding ``{"keywords", "answer"}`` or lists."""
+    rows = []
+    for line in raw.decode("utf-8-sig").splitlines():
+        if not line.strip():
+            continue
+        record = json.loads(line)
+        if isinstance(record, dict):
+            keywords, answer = record.get("keywords"), record.get("answer")
+        else:
+            keywords, answer = (list(record) + [None, None])[:2]
+        if keywords is not None and answer not in (None, ""):
+            rows.append((keywords, answer))
+    return rows
+
+
+class PathWatcher:
+    """Files that can be watched for changes instead of polled."""
+
+    name = "files"
+    paths = ()
+
+    async def changes(self, interval):
+        """Yield whenever one of ``paths`` is modified.
+
+        Polls modification times every ``interval`` seconds unless the
+        optional ``watchfiles`` package is installed (the ``watch`` extra),
+        in which case the OS change notifications it wraps are used instead.
+        """
+        try:
+            from watchfiles import awatch
+        except ImportError:
+            awatch = None
+
+        paths = {os.path.abspath(path) for path in self.paths}
+        if awatch is not None:
+            # Watch the directories so editors that save by renaming a
+            # temporary file over the original are still noticed.
+            directories = {os.path.dirname(path) for path in paths}
+            async for _ in awatch(
+                *directories,
+                watch_filter=lambda change, path: path in paths,
+                debounce=int(interval * 1000),
+            ):
+                yield
+            return
+
+        stamp = self._stamp()
+        while True:
+            await asyncio.sleep(interval)
+            current = self._stamp()
+            if current != stamp:
+                stamp = current
+                yield
+
+    def _stamp(self):
+        stamps = []
+        for path in self.paths:
+            try:
+                stat = os.stat(path)
+                stamps.append((stat.st_mtime_ns, stat.st_size))
+            except OSError:
+                stamps.append(None)
+        return tuple(stamps)
+
+
+class KnowledgeSource(PathWatcher, abc.ABC):
+    """Where the keyword/answer rows of the knowledge base come from.
+
+    :meth:`read` returns the raw bytes of the source, or ``None`` when it
+    has not changed since the last successful read, and :meth:`parse`
+    turns those bytes into ``(keywords, answer)`` rows. Local sources set
+    ``paths`` and can be watched for changes instead of polled.
+    """
+
+    name = "knowledge source"
+
+    @abc.abstractmethod
+    async def read(self):
+        """Return the raw content, or ``None`` if it is unchanged."""
+
+    @abc.abstractmethod
+    def parse(self, raw):
+        """Return the ``(keywords, answer)`` rows in ``raw``."""
+
+    def reset(self):
+        """Make the next :meth:`read` return the content even if unchanged."""
+
+    async def close(self):
+        pass
+
+
+class SheetSource(KnowledgeSource):
+    """A Google Sheets CSV export fetched with conditional requests."""
+
+    name = "Google Sheet"
+
+    def __init__(self, url, **fetch_options):
+        self.fetcher = ConditionalFetcher(url, **fetch_options)
+
+    async def read(self):
+        return await self.fetcher.fetch()
+
+    def parse(self, raw):
+        return parse_csv(raw)
+
+    def reset(self):
+        self.fetcher.reset()
+
+    async def close(self):
+        await self.fetcher.close()
+
+
+class FileSource(KnowledgeSource):
+    """A CSV or JSONL file shipped alongside the bot."""
+
+    PARSERS = {".csv": parse_csv, ".jsonl": parse_jsonl}
+
+    def __init__(self, path):
+        extension = os.path.splitext(path)[1].lower()
+        if extension not in self.PARSERS:
+            raise ValueError(f"Unsupported knowledge file type: {path}")
+        self.path = path
+        self.paths = (path,)
+        self.name = os.path.basename(path)
+        self.extension = extension
+        self.last_stamp = None
+
+    def _read(self):
+        stamp = self._stamp()
+        if stamp == self.last_stamp:
+            return None
+        with open(self.path, "rb") as f:
+            raw = f.read()
+        self.last_stamp = stamp
+        return raw
+
+    async def read(self):
+        return await asyncio.to_thread(self._read)
+
+    def parse(self, raw):
+        return self.PARSERS[self.extension](raw)
+
+    def reset(self):
+        self.last_stamp = None
+
+
+class SQLiteSource(FileSource):
+    """The first two columns of a table in a SQLite database."""
+
+    def __init__(self, path, table):
+        self.path = path
+        # Writes in WAL mode land in the -wal file until a checkpoint.
+        self.paths = (path, f"{path}-wal")
+        self.name = f"{os.path.basename(path)}:{table}"
+        self.table = table
+        self.last_stamp = None
+
+    def _read(self):
+        stamp = self._stamp()
+        if stamp == self.last_stamp:
+            return None
+        table = self.table.replace('"', '""')
+        connection = sqlite3.connect(f"file:{self.path}?mode=ro", uri=True)
+        try:
+            rows = connection.execute(f'SELECT * FROM "{table}"').fetchall()
+        finally:
+            connection.close()
+        self.last_stamp = stamp
+        return json.dumps([list(row[:2]) for row in rows]).encode()
+
+    def parse(self, raw):
+        return [
+            (keywords, answer)
+            for keywords, answer in json.loads(raw)
+            if keywords is not None and answer not in (None, "")
+        ]
+
+
+class SnapshotWatcher(PathWatcher):
+    """Watches the ``CURRENT`` pointer of a snapshot directory.
+
+    Reader processes never fetch or parse anything themselves; they attach
+    each new generation the builder publishes as the pointer changes.
+    """
+
+    def __init__(self, directory):
+        os.makedirs(directory, exist_ok=True)
+        self.paths = (os.path.join(directory, CURRENT_FILE),)
+        self.name = f"snapshots in {directory}"
+
+
+def get_source(spec, sheet_url="", table="responses", **fetch_options):
+    """Build the knowledge source named by ``KNOWLEDGE_SOURCE``.
+
+    ``None`` means no source. An empty spec or ``sheet`` uses the Google Sheet export (``None`` when no
+    sheet is configured) and ``sheet:<id>`` another sheet. ``sqlite:<path>``
+    or a ``.db``/``.sqlite`` path reads ``table`` from a database, and
+    ``.csv``/``.jsonl`` paths read a file.
+    """
+    if spec is None:
+        return None
+    if not spec or spec == "sheet":
+        return SheetSource(sheet_url, **fetch_options) if sheet_url else None
+    if spec.startswith("sheet:"):
+        sheet_id = spec[len("sheet:") :]
+        return SheetSource(SHEET_EXPORT_URL.format(sheet_id), **fetch_options)
+    if spec.startswith("sqlite:"):
+        return SQLiteSource(spec[len("sqlite:") :], table)
+    if os.path.splitext(spec)[1].lower() in (".db", ".sqlite", ".sqlite3"):
+        return SQLiteSource(spec, table)
+    return FileSource(spec)
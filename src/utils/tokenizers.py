@@ -0,0 +1,188 @@
+import functools
+import re
+
+# Characters NLTK's word tokenizer always pads into separate tokens.
+_WORD = re.compile(r"[^\s;@#$%&?!*()\[\]{}<>\"`«“‘„»”’‒-―]+")
+# Splits inside a word: ellipses, double dashes, doubled quotes, commas and
+# colons not followed by a digit, and opening single quotes.
+_INNER = re.compile(
+    r"(\.{2,}|--|''|[:,](?!\d)|(?<!\w)'(?!(?:re|ve|ll|m|t|s|d|n)\b)(?=\w))"
+)
+_CONTRACTIONS = re.compile(
+    r"\b(?:(can)(not)|(d)('ye)|(gim)(me)|(gon)(na)|(got)(ta)|(lem)(me)"
+    r"|(more)('n)|(wan)(na)$)\b"
+)
+_CONTRACTION_WORDS = {
+    "cannot": ("can", "not"),
+    "gimme": ("gim", "me"),
+    "gonna": ("gon", "na"),
+    "gotta": ("got", "ta"),
+    "lemme": ("lem", "me"),
+    "wanna": ("wan", "na"),
+}
+# Characters after a period that let Punkt end a sentence there.
+_SENTENCE_FOLLOWERS = frozenset(")\";}]*:@'({[!?")
+# Initials and numbers Punkt keeps attached to their period when the next
+# token is lowercase or punctuation.
+_INITIAL_OR_NUMBER = re.compile(r"[^\W\d]|-?[.,]?\d[\d,.-]*")
+_NEXT_TOKEN = re.compile(r"\s*(\S)")
+# A lone punctuation token, which Punkt never takes as a sentence start.
+_PUNCTUATION_TOKEN = re.compile(
+    r"\s*(?:[;:,]|[.!?](?=$|\s|[)\";}\]*:@'({\[!?]|,(?:$|\s)|--)|[!?](?=\.\.))"
+)
+# Punkt reads the whole next chunk of text after a period, and any sentence
+# end it finds inside that chunk splits there regardless of the period.
+_NEXT_CHUNK = re.compile(r"\s+(\S+)")
+_INNER_END = re.compile(r"[?!](?=[)\";}\]*:@'({\[!?]|\.\.|--)")
+_INNER_PERIOD = re.compile(r"([^\s)\";}\]*:@'({\[!?]*?)\.(?=([)\";}\]*:@'({\[!?]))")
+# The tokenizer always splits the period that ends the text.
+_TEXT_END = re.compile(r"[\])}>\"']*\s*$")
+# Closing quotes and brackets standing alone after a sentence end are moved
+# back into that sentence, which then no longer ends in the period.
+_REALIGNED = re.compile(r"\s+[\"')\]}]+(?:\s|--|$)")
+# Common abbreviations, used only when Punkt's English model is missing.
+_ABBREVIATIONS = frozenset(
+    {"mr", "mrs", "ms", "dr", "vs", "etc", "e.g", "i.e", "jr", "sr", "inc", "ltd"}
+)
+
+
+@functools.cache
+def abbreviations():
+    """Return the abbreviations Punkt's English model does not end sentences on.
+
+    They are read from NLTK's ``punkt_tab`` data when it is installed, so
+    both backends agree on words like ``corp.``, and fall back to a short
+    built-in list otherwise.
+    """
+    from nltk.data import find
+    from nltk.tokenize.punkt import load_punkt_params
+
+    try:
+        return frozenset(
+            load_punkt_params(find("tokenizers/punkt_tab/english/")).abbrev_types
+        )
+    except LookupError:
+        return _ABBREVIATIONS
+
+
+def _breaks_inside(chunk):
+    if _INNER_END.search(chunk):
+        return True
+    for match in _INNER_PERIOD.finditer(chunk):
+        word, follower = match.groups()
+        if word.lower() in abbreviations():
+            continue
+        if follower in ":!?" and _INITIAL_OR_NUMBER.fullmatch(word):
+            continue
+        return True
+    return False
+
+
+def _ends_sentence(part, follower, text, end, quoted):
+    if follower and not follower.isspace() and follower not in _SENTENCE_FOLLOWERS:
+        return False
+    if _REALIGNED.match(text, end):
+        return False
+    if _TEXT_END.match(text, end):
+        return True
+    chunk = _NEXT_CHUNK.match(text, end)
+    if chunk and _breaks_inside(chunk.group(1)):
+        return True
+    if part.lower() in abbreviations():
+        return False
+    if not quoted and _INITIAL_OR_NUMBER.fullmatch(part):
+        match = _NEXT_TOKEN.match(text, end)
+        if (match and match.group(1).islower()) or _PUNCTUATION_TOKEN.match(text, end):
+            return False
+        # Initials before a capitalised word are read as names (J. Bach).
+        if match and match.group(1).isupper() and not part[-1].isdigit():
+            return False
+    return True
+
+
+def _strip_clitics(part):
+    for clitics in (("'s", "'m", "'d", "'"), ("'ll", "'re", "'ve", "n't")):
+        for clitic in clitics:
+            if part.endswith(clitic) and len(part) > len(clitic):
+                if part[-len(clitic) - 1] != "'":
+                    part = part[: -len(clitic)]
+                break
+    return part
+
+
+def _word_tokens(word, text, end):
+    pieces = _INNER.split(word)
+    offset = end - len(word)
+    for i in range(0, len(pieces), 2):
+        part = pieces[i]
+        offset += len(part)
+        if i + 1 < len(pieces):
+            follower = pieces[i + 1][0]
+            next_offset = offset
+            offset += len(pieces[i + 1])
+        else:
+            follower = text[end : end + 1]
+            next_offset = end
+        quoted = pieces[i - 1 : i] == ["'"]
+        if part.endswith("'") and len(part) > 1 and part[-2] != "'":
+            # A closing quote comes off before the period or clitic it
+            # follows (it's' -> it 's '), unless nothing but space follows.
+            body, body_follower, body_end = part[:-1], "'", next_offset - 1
+            if follower.isspace() and _NEXT_CHUNK.match(text, next_offset):
+                part = body
+        else:
+            body, body_follower, body_end = part, follower, next_offset
+        if (
+            len(body) > 1
+            and body[-1] == "."
+            and body[-2] != "."
+            and _ends_sentence(body[:-1], body_follower, text, body_end, quoted)
+        ):
+            part = body[:-1]
+        part = _strip_clitics(part)
+        for token in _CONTRACTIONS.sub(_split_contraction, part).split():
+            if token.isalnum():
+                yield token
+
+
+def _split_contraction(match):
+    return " " + " ".join(group for group in match.groups() if group) + " "
+
+
+def regex_tokenize(text):
+    """Return the alphanumeric tokens ``word_tokenize`` would produce.
+
+    Words are split on the punctuation NLTK always pads, and only words that
+    are not already alphanumeric go through the slower handling of commas,
+    colons, sentence-final periods, quotes, clitics and contractions.
+    Non-alphanumeric tokens are dropped, as ``NLPProcessor.preprocess_text``
+    discards them anyway. Sentence ends use Punkt's abbreviations but not
+    the rest of its trained model, and runs of punctuation glued between two
+    words (say ``b.''I'm``) can still split differently from NLTK.
+    """
+    tokens = []
+    for match in _WORD.finditer(text):
+        word = match.group()
+        if word.isalnum():
+            tokens.extend(_CONTRACTION_WORDS.get(word, (word,)))
+        else:
+            tokens.extend(_word_tokens(word, text, match.end()))
+    return tokens
+
+
+def nltk_tokenize(text):
+    from nltk.tokenize import word_tokenize
+
+    return word_tokenize(text)
+
+
+TOKENIZERS = {"regex": regex_tokenize, "nltk": nltk_tokenize}
+
+
+def get_tokenizer(name):
+    try:
+        return TOKENIZERS[name]
+    except KeyError:
+        raise ValueError(
+            f"Unknown tokenizer backend '{name}', expected one of {sorted(TOKENIZERS)}"
+        ) from None
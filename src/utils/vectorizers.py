@@ -0,0 +1,57 @@
+import numpy as np
+from sklearn.feature_extraction.text import HashingVectorizer, TfidfVectorizer
+from sklearn.preprocessing import normalize
+
+
+class HashedCharVectorizer:
+    """TF-IDF over hashed character n-grams, with no vocabulary.
+
+    N-grams of each word are hashed straight into ``n_features`` columns, so
+    transforming a message needs nothing but the fixed-size ``idf_`` array,
+    memory does not grow with the knowledge base, and misspelled words still
+    share most of their n-grams with the correct spelling. Weights follow
+    ``TfidfVectorizer``'s defaults (smoothed IDF, L2-normalised rows).
+    """
+
+    def __init__(self, n_features=2**18, ngram_range=(2, 4)):
+        self.n_features = n_features
+        self.ngram_range = tuple(ngram_range)
+        self.hasher = HashingVectorizer(
+            analyzer="char_wb",
+            ngram_range=self.ngram_range,
+            n_features=n_features,
+            alternate_sign=False,
+            norm=None,
+            dtype=np.float32,
+        )
+        self.idf_ = None
+
+    def fit_transform(self, documents):
+        counts = self.hasher.transform(documents)
+        document_frequency = np.bincount(
+            counts.indices, minlength=self.n_features
+        ).astype(np.float32)
+        documents = counts.shape[0]
+        self.idf_ = np.log((1 + documents) / (1 + document_frequency)) + 1
+        return self._weight(counts)
+
+    def transform(self, documents):
+        return self._weight(self.hasher.transform(documents))
+
+    def _weight(self, counts):
+        counts.data *= self.idf_[counts.indices]
+        return normalize(counts, copy=False)
+
+
+VECTORIZERS = ("word", "hashed")
+
+
+def get_vectorizer(name, n_features=2**18):
+    """Return an unfitted vectorizer for ``VECTORIZER_MODE``."""
+    if name == "word":
+        return TfidfVectorizer(dtype=np.float32)
+    if name == "hashed":
+        return HashedCharVectorizer(n_features)
+    raise ValueError(
+        f"Unknown vectorizer mode '{name}', expected one of {sorted(VECTORIZERS)}"
+    )
@@ -0,0 +1,53 @@
+import discord
+import nltk
+import pytest
+import yarl
+
+from src.utils import nlp_processor
+from tests.fake_discord import FakeDiscord
+from tests.fake_openai import FakeOpenAI
+from tests.fake_sheet import FakeSheet
+
+
+@pytest.fixture
+def fake_discord(monkeypatch):
+    """A fake Discord API with 4 shards and 10 guilds that bots log in to."""
+    server = FakeDiscord(shards=4, guilds=10).start()
+    monkeypatch.setattr(discord.http.Route, "BASE", f"{server.base_url}/api/v10")
+    # Bots given a shard count connect here without asking /gateway/bot.
+    monkeypatch.setattr(
+        discord.gateway.DiscordWebSocket,
+        "DEFAULT_GATEWAY",
+        yarl.URL(server.base_url.replace("http://", "ws://") + "/ws"),
+    )
+    yield server
+    server.stop()
+
+
+@pytest.fixture
+def fake_openai():
+    """An OpenAI-compatible API streaming "Hello, world." in four chunks."""
+    server = FakeOpenAI().start()
+    yield server
+    server.stop()
+
+
+@pytest.fixture
+def fake_sheet():
+    """A CSV export with two rows that answers unchanged requests with a 304."""
+    server = FakeSheet().start()
+    yield server
+    server.stop()
+
+
+@pytest.fixture
+def nlp_settings(monkeypatch):
+    """Build processors with the regex tokenizer, which needs no Punkt model.
+
+    Skips the test when NLTK's stopwords are not downloaded.
+    """
+    try:
+        nltk.data.find("corpora/stopwords")
+    except LookupError:
+        pytest.skip("NLTK stopwords are not installed")
+    monkeypatch.setattr(nlp_processor, "TOKENIZER_BACKEND", "regex")
@@ -0,0 +1,212 @@
+"""A minimal stand-in for Discord's REST API and gateway.
+
+It serves just enough for a bot to log in, identify each shard and receive
+its guilds, so sharding and cluster code can run without a network. Every
+guild ``i`` belongs to shard ``i % shard_count``.
+"""
+
+import asyncio
+import json
+import threading
+
+from aiohttp import WSMsgType, web
+
+USER = {
+    "id": "1000",
+    "username": "lexis",
+    "discriminator": "0",
+    "avatar": None,
+    "bot": True,
+    "global_name": None,
+}
+
+
+def guild_payload(i):
+    guild_id = str(5000 + i)
+    return {
+        "id": guild_id,
+        "name": f"guild-{i}",
+        "unavailable": False,
+        "member_count": 1,
+        "large": False,
+        "members": [],
+        "channels": [],
+        "roles": [
+            {
+                "id": guild_id,
+                "name": "@everyone",
+                "permissions": "0",
+                "position": 0,
+                "color": 0,
+                "hoist": False,
+                "managed": False,
+                "mentionable": False,
+            }
+        ],
+        "emojis": [],
+        "stickers": [],
+        "features": [],
+        "threads": [],
+        "presences": [],
+        "voice_states": [],
+        "owner_id": "1",
+        "premium_tier": 0,
+        "verification_level": 0,
+        "default_message_notifications": 0,
+        "explicit_content_filter": 0,
+        "mfa_level": 0,
+        "nsfw_level": 0,
+        "preferred_locale": "en-US",
+        "system_channel_flags": 0,
+        "afk_timeout": 300,
+    }
+
+
+def _json(data):
+    # discord.py only parses bodies labelled exactly application/json.
+    return web.Response(
+        body=json.dumps(data).encode(), headers={"Content-Type": "application/json"}
+    )
+
+
+class FakeDiscord:
+    """Runs the fake API on a background thread; see ``base_url``."""
+
+    def __init__(self, shards=4, guilds=10):
+        self.shards = shards
+        self.guilds = guilds
+        self.identified = []
+        self.base_url = None
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, daemon=True)
+        self._runner = None
+
+    def start(self):
+        self._thread.start()
+        asyncio.run_coroutine_threadsafe(self._serve(), self._loop).result(10)
+        return self
+
+    def stop(self):
+        asyncio.run_coroutine_threadsafe(self._runner.cleanup(), self._loop).result(10)
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join(10)
+
+    async def _serve(self):
+        app = web.Application()
+        app.router.add_get("/api/v10/gateway/bot", self._gateway_bot)
+        app.router.add_get("/api/v10/gateway", self._gateway)
+        app.router.add_get("/api/v10/users/@me", self._user)
+        app.router.add_patch("/api/v10/users/@me", self._user)
+        app.router.add_get("/api/v10/oauth2/applications/@me", self._application)
+        app.router.add_put("/api/v10/applications/1000/commands", self._commands)
+        app.router.add_get("/ws", self._websocket)
+        self._runner = web.AppRunner(app)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, "127.0.0.1", 0)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+        self.base_url = f"http://127.0.0.1:{port}"
+
+    def _ws_url(self):
+        return self.base_url.replace("http://", "ws://") + "/ws"
+
+    async def _gateway_bot(self, request):
+        return _json(
+            {
+                "url": self._ws_url(),
+                "shards": self.shards,
+                "session_start_limit": {
+                    "total": 1000,
+                    "remaining": 1000,
+                    "reset_after": 0,
+                    "max_concurrency": 16,
+                },
+            }
+        )
+
+    async def _gateway(self, request):
+        return _json({"url": self._ws_url()})
+
+    async def _user(self, request):
+        return _json(USER)
+
+    async def _application(self, request):
+        return _json(
+            {
+                "id": "1000",
+                "name": "lexis",
+                "icon": None,
+                "description": "",
+                "bot_public": True,
+                "bot_require_code_grant": False,
+                "verify_key": "x",
+                "flags": 0,
+                "owner": USER,
+            }
+        )
+
+    async def _commands(self, request):
+        return _json([])
+
+    async def _websocket(self, request):
+        socket = web.WebSocketResponse()
+        await socket.prepare(request)
+        await self._send(socket, 10, {"heartbeat_interval": 1000})
+        sequence = 0
+        async for message in socket:
+            if message.type != WSMsgType.TEXT:
+                continue
+            data = json.loads(message.data)
+            if data["op"] == 1:
+                await self._send(socket, 11, None)
+            elif data["op"] == 2:
+                shard_id, shard_count = data["d"].get("shard", [0, 1])
+                self.identified.append(shard_id)
+                guilds = [
+                    guild_payload(i)
+                    for i in range(self.guilds)
+                    if i % shard_count == shard_id
+                ]
+                sequence += 1
+                await self._send(
+                    socket,
+                    0,
+                    {
+                        "v": 10,
+                        "user": USER,
+                        "guilds": [
+                            {"id": guild["id"], "unavailable": True} for guild in guilds
+                        ],
+                        "session_id": f"session-{shard_id}",
+                        "resume_gateway_url": self._ws_url(),
+                        "shard": [shard_id, shard_count],
+                        "application": {"id": "1000", "flags": 0},
+                    },
+                    "READY",
+                    sequence,
+                )
+                for guild in guilds:
+                    sequence += 1
+                    await self._send(socket, 0, guild, "GUILD_CREATE", sequence)
+            elif data["op"] == 8:
+                sequence += 1
+                await self._send(
+                    socket,
+                    0,
+                    {
+                        "guild_id": data["d"]["guild_id"],
+                        "members": [],
+                        "chunk_index": 0,
+                        "chunk_count": 1,
+                        "nonce": data["d"].get("nonce"),
+                    },
+                    "GUILD_MEMBERS_CHUNK",
+                    sequence,
+                )
+        return socket
+
+    @staticmethod
+    async def _send(socket, op, data, event=None, sequence=None):
+        await socket.send_str(
+            json.dumps({"op": op, "d": data, "s": sequence, "t": event})
+        )
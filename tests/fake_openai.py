@@ -0,0 +1,107 @@
+"""A minimal OpenAI-compatible chat completions server.
+
+Streams the configured ``chunks`` as server-sent events, ``delay`` seconds
+apart, and ends with a usage chunk when the client asks for one with
+``stream_options.include_usage``. Requests are recorded in ``requests``.
+"""
+
+import asyncio
+import json
+import threading
+
+from aiohttp import web
+
+USAGE = {"prompt_tokens": 321, "completion_tokens": 12, "total_tokens": 333}
+
+
+def _chunk(choices, usage=None):
+    return {
+        "id": "chatcmpl-fake",
+        "object": "chat.completion.chunk",
+        "created": 0,
+        "model": "fake-model",
+        "choices": choices,
+        "usage": usage,
+    }
+
+
+class FakeOpenAI:
+    """Runs the fake API on a background thread; see ``base_url``."""
+
+    def __init__(self, chunks=("Hello", ", ", "world", "."), delay=0.0):
+        self.chunks = list(chunks)
+        self.delay = delay
+        self.requests = []
+        self.base_url = None
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, daemon=True)
+        self._runner = None
+
+    def start(self):
+        self._thread.start()
+        asyncio.run_coroutine_threadsafe(self._serve(), self._loop).result(10)
+        return self
+
+    def stop(self):
+        asyncio.run_coroutine_threadsafe(self._runner.cleanup(), self._loop).result(10)
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join(10)
+
+    async def _serve(self):
+        app = web.Application()
+        app.router.add_post("/v1/chat/completions", self._completions)
+        self._runner = web.AppRunner(app)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, "127.0.0.1", 0)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+        self.base_url = f"http://127.0.0.1:{port}/v1"
+
+    async def _completions(self, request):
+        body = await request.json()
+        self.requests.append(body)
+        if not body.get("stream"):
+            return web.json_response(
+                {
+                    "id": "chatcmpl-fake",
+                    "object": "chat.completion",
+                    "created": 0,
+                    "model": "fake-model",
+                    "choices": [
+                        {
+                            "index": 0,
+                            "message": {
+                                "role": "assistant",
+                                "content": "".join(self.chunks),
+                            },
+                            "finish_reason": "stop",
+                        }
+                    ],
+                    "usage": USAGE,
+                }
+            )
+
+        response = web.StreamResponse(headers={"Content-Type": "text/event-stream"})
+        await response.prepare(request)
+        include_usage = (body.get("stream_options") or {}).get("include_usage")
+        for text in self.chunks:
+            await asyncio.sleep(self.delay)
+            await self._send(
+                response,
+                _chunk(
+                    [{"index": 0, "delta": {"content": text}, "finish_reason": None}]
+                ),
+            )
+        await self._send(
+            response, _chunk([{"index": 0, "delta": {}, "finish_reason": "stop"}])
+        )
+        if include_usage:
+            # As on the real API, usage comes alone in a final, choiceless chunk.
+            await self._send(response, _chunk([], USAGE))
+        await response.write(b"data: [DONE]\n\n")
+        await response.write_eof()
+        return response
+
+    @staticmethod
+    async def _send(response, data):
+        await response.write(f"data: {json.dumps(data)}\n\n".encode())
@@ -0,0 +1,64 @@
+"""A minimal stand-in for a Google Sheets CSV export.
+
+Serves ``body`` with an ``ETag`` and answers a matching ``If-None-Match``
+with a 304, like the real export. Statuses queued in ``errors`` are
+returned first, one per request. Request headers are recorded in
+``requests``.
+"""
+
+import asyncio
+import threading
+
+from aiohttp import web
+
+CSV = (
+    b"keywords,answer\n"
+    b'"reset password, forgot password",Use the reset link on the login page.\n'
+    b"verify account,Verify in #verify with the bot.\n"
+)
+
+
+class FakeSheet:
+    """Runs the fake export on a background thread; see ``url``."""
+
+    def __init__(self, body=CSV, etag='"v1"'):
+        self.body = body
+        self.etag = etag
+        self.errors = []
+        self.requests = []
+        self.url = None
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, daemon=True)
+        self._runner = None
+
+    def start(self):
+        self._thread.start()
+        asyncio.run_coroutine_threadsafe(self._serve(), self._loop).result(10)
+        return self
+
+    def stop(self):
+        asyncio.run_coroutine_threadsafe(self._runner.cleanup(), self._loop).result(10)
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join(10)
+
+    async def _serve(self):
+        app = web.Application()
+        app.router.add_get("/export", self._export)
+        self._runner = web.AppRunner(app)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, "127.0.0.1", 0)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+        self.url = f"http://127.0.0.1:{port}/export?format=csv"
+
+    async def _export(self, request):
+        self.requests.append(dict(request.headers))
+        if self.errors:
+            return web.Response(status=self.errors.pop(0))
+        if self.etag and request.headers.get("If-None-Match") == self.etag:
+            return web.Response(status=304)
+        return web.Response(
+            body=self.body,
+            content_type="text/csv",
+            headers={"ETag": self.etag} if self.etag else None,
+        )
@@ -0,0 +1,143 @@
+import asyncio
+import time
+from types import SimpleNamespace
+
+import discord
+import pytest
+
+from src.cogs.ai import AnswerStream
+from src.utils import ai_client
+
+KNOWLEDGE_BASE = [{"title": "greeting", "content": "Say hello to the world."}]
+
+
+@pytest.fixture
+def openai_settings(fake_openai, monkeypatch):
+    """Point new AI clients at the fake API, without an answer cache."""
+    monkeypatch.setattr(ai_client, "OPENAI_API_KEY", "test-key")
+    monkeypatch.setattr(ai_client, "OPENAI_BASE_URL", fake_openai.base_url)
+    monkeypatch.setattr(ai_client, "ANSWER_CACHE_FILE", "")
+
+
+class FakeMessage:
+    """Records when and with what text it was posted or edited.
+
+    Each post or edit takes ``delay`` seconds, like one held back by
+    Discord's rate limits.
+    """
+
+    def __init__(self, edits, delay=0.0):
+        self.edits = edits
+        self.delay = delay
+        self.created_at = None
+
+    async def reply(self, embed):
+        await asyncio.sleep(self.delay)
+        self.edits.append((time.monotonic(), embed.description))
+        return self
+
+    async def edit(self, embed):
+        await asyncio.sleep(self.delay)
+        self.edits.append((time.monotonic(), embed.description))
+
+
+def fake_context(edits, delay=0.0):
+    return SimpleNamespace(
+        message=FakeMessage(edits, delay),
+        author=None,
+        bot=SimpleNamespace(user=SimpleNamespace(name="lexis")),
+    )
+
+
+def test_streamed_answer_grows_with_each_chunk(openai_settings, fake_openai):
+    texts = []
+
+    async def run():
+        ai = ai_client.AIClient()
+        try:
+            return await ai.ask(1, "hello?", KNOWLEDGE_BASE, texts.append)
+        finally:
+            await ai.close()
+
+    answer, success = asyncio.run(run())
+
+    assert success
+    assert answer == "Hello, world."
+    assert texts == ["Hello", "Hello, ", "Hello, world", "Hello, world."]
+    assert fake_openai.requests[0]["stream"] is True
+
+
+def test_usage_is_read_from_the_final_chunk(openai_settings, fake_openai, caplog):
+    async def run():
+        ai = ai_client.AIClient()
+        try:
+            request = {"model": "fake-model", "messages": []}
+            result = await ai._stream_completion(request, lambda text: None)
+            with caplog.at_level("INFO", logger=ai_client.__name__):
+                await ai._make_openai_request(
+                    "hello?", KNOWLEDGE_BASE, lambda text: None
+                )
+            return result
+        finally:
+            await ai.close()
+
+    answer, usage = asyncio.run(run())
+
+    assert answer == "Hello, world."
+    assert usage.prompt_tokens == 321
+    assert fake_openai.requests[0]["stream_options"] == {"include_usage": True}
+    assert "Prompt used 321 tokens" in caplog.text
+
+
+def test_answer_stream_throttles_edits():
+    edits = []
+    interval = 0.2
+
+    async def run():
+        stream = AnswerStream(fake_context(edits), interval)
+        text = ""
+        for i in range(50):
+            text += f"{i} "
+            stream.update(text)
+            await asyncio.sleep(0.01)
+        await stream.finish("AI Answer", text, discord.Color.green(), "🤖")
+        return text
+
+    text = asyncio.run(run())
+
+    times = [at for at, _ in edits]
+    assert 2 < len(edits) < 10
+    assert all(b - a >= interval * 0.9 for a, b in zip(times, times[1:]))
+    assert edits[0][1].endswith(AnswerStream.CURSOR)
+    assert edits[-1][1] == text
+
+
+def test_slow_channels_do_not_hold_up_a_shared_answer(openai_settings, fake_openai):
+    fake_openai.delay = 0.05
+    edits = []
+
+    async def run():
+        ai = ai_client.AIClient()
+        streams = [AnswerStream(fake_context(edits, delay=1), 0.2) for _ in range(20)]
+        try:
+            start = time.monotonic()
+            results = await asyncio.gather(
+                *(
+                    ai.ask(user, "hello?", KNOWLEDGE_BASE, stream.update, ("kb", "q"))
+                    for user, stream in enumerate(streams)
+                )
+            )
+            elapsed = time.monotonic() - start
+            for stream in streams:
+                stream.cancel()
+            return results, elapsed, ai.coalesced
+        finally:
+            await ai.close()
+
+    results, elapsed, coalesced = asyncio.run(run())
+
+    assert results == [("Hello, world.", True)] * 20
+    assert coalesced == 19
+    assert len(fake_openai.requests) == 1
+    # Twenty one-second replies awaited in turn would take twenty seconds.
+    assert elapsed < 1
@@ -0,0 +1,99 @@
+import asyncio
+
+import pytest
+
+from src.utils import fetcher as fetcher_module
+from src.utils import nlp_processor
+from src.utils.fetcher import ConditionalFetcher, FetchError
+from src.utils.nlp_processor import NLPProcessor
+
+
+def fetch(fetcher, times=1):
+    async def run():
+        try:
+            return [await fetcher.fetch() for _ in range(times)]
+        finally:
+            await fetcher.close()
+
+    return asyncio.run(run())
+
+
+@pytest.fixture
+def sheet_processor(fake_sheet, nlp_settings, monkeypatch):
+    """A processor reading the fake sheet without retries or snapshots."""
+    monkeypatch.setattr(nlp_processor, "GOOGLE_SHEET_URL", fake_sheet.url)
+    monkeypatch.setattr(nlp_processor, "SHEET_FETCH_RETRIES", 0)
+    return NLPProcessor(source_spec="sheet", snapshot_dir=None, role="builder")
+
+
+def test_unchanged_sheet_costs_a_304(fake_sheet):
+    fetcher = ConditionalFetcher(fake_sheet.url)
+
+    assert fetch(fetcher, times=2) == [fake_sheet.body, None]
+    assert fake_sheet.requests[1]["If-None-Match"] == fake_sheet.etag
+    assert fetcher.not_modified == 1
+
+
+def test_retryable_status_is_retried_with_backoff(fake_sheet, monkeypatch):
+    delays = []
+
+    def uniform(low, high):
+        delays.append((low, high))
+        return 0
+
+    monkeypatch.setattr(fetcher_module.random, "uniform", uniform)
+    fake_sheet.errors = [503, 503]
+    fetcher = ConditionalFetcher(fake_sheet.url, retries=3, backoff=0.5)
+
+    assert fetch(fetcher) == [fake_sheet.body]
+    assert fetcher.requests == 3
+    assert delays == [(0, 0.5), (0, 1.0)]
+
+
+def test_client_error_is_not_retried(fake_sheet):
+    fake_sheet.errors = [404]
+    fetcher = ConditionalFetcher(fake_sheet.url, retries=3, backoff=0)
+
+    with pytest.raises(FetchError, match="404"):
+        fetch(fetcher)
+    assert fetcher.requests == 1
+
+
+def test_refresh_does_not_parse_an_unchanged_sheet(sheet_processor, monkeypatch):
+    parsed = []
+    parse = sheet_processor.source.parse
+    monkeypatch.setattr(
+        sheet_processor.source, "parse", lambda raw: parsed.append(raw) or parse(raw)
+    )
+
+    async def run():
+        try:
+            return await sheet_processor.refresh(), await sheet_processor.refresh()
+        finally:
+            await sheet_processor.close()
+
+    first, second = asyncio.run(run())
+
+    assert len(parsed) == 1
+    assert second is first
+    assert len(first) > 0
+
+
+def test_failed_fetch_keeps_the_previous_index(sheet_processor, fake_sheet):
+    async def run():
+        try:
+            built = await sheet_processor.refresh()
+            fake_sheet.etag = None
+            fake_sheet.errors = [500]
+            return built, await sheet_processor.refresh()
+        finally:
+            await sheet_processor.close()
+
+    built, after = asyncio.run(run())
+
+    assert len(built) > 0
+    assert after is built
+    assert sheet_processor.index is built
+    assert sheet_processor.find_best_match("forgot password")[0] == (
+        "Use the reset link on the login page."
+    )
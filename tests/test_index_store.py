@@ -0,0 +1,60 @@
+from src.utils.index_store import save_index
+from src.utils.nlp_index import StringMap, StringTable
+from src.utils.nlp_processor import NLPProcessor
+
+ROWS = [
+    ("reset password, forgot password", "Use the reset link on the login page."),
+    ("verify account, verification", "Verify in #verify with the bot."),
+    ("café opening hours", "The café opens at 9 — see the pinned post."),
+    ("forgot password, lost login", "Use the reset link on the login page."),
+]
+MESSAGES = ["how do I reset my password", "café hours?", "verify", "nothing"]
+
+
+def published(snapshot_dir):
+    builder = NLPProcessor(source_spec=None, snapshot_dir=snapshot_dir, role="builder")
+    builder.index = builder.build_index(ROWS, 1, digest="rows")
+    save_index(builder.index, snapshot_dir, builder.snapshot_signature())
+    return builder
+
+
+def test_reader_serves_strings_from_the_snapshot(nlp_settings, tmp_path):
+    builder = published(str(tmp_path))
+    reader = NLPProcessor(source_spec=None, snapshot_dir=str(tmp_path), role="reader")
+    built, loaded = builder.index, reader.index
+
+    assert isinstance(loaded.phrases, StringTable)
+    assert isinstance(loaded.vectorizer.vocabulary_, StringMap)
+    assert list(loaded.phrases) == list(built.phrases)
+    assert list(loaded.answers) == list(built.answers)
+    assert list(loaded.answer_phrases) == list(built.answer_phrases)
+    assert dict(loaded.exact_phrases) == built.exact_phrases
+    assert dict(loaded.vectorizer.vocabulary_) == built.vectorizer.vocabulary_
+    for message in MESSAGES:
+        assert reader.find_relevant_answers(message, 3) == (
+            builder.find_relevant_answers(message, 3)
+        )
+        assert reader.find_best_match(message) == builder.find_best_match(message)
+
+
+def test_only_builders_load_row_phrases(nlp_settings, tmp_path):
+    builder = published(str(tmp_path))
+
+    reader = NLPProcessor(source_spec=None, snapshot_dir=str(tmp_path), role="reader")
+    restarted = NLPProcessor(
+        source_spec=None, snapshot_dir=str(tmp_path), role="builder"
+    )
+
+    assert reader.index.row_phrases == {}
+    assert restarted.index.row_phrases == builder.index.row_phrases
+
+
+def test_string_map_lookups():
+    mapping = {"": 3, "a": 0, "é": 1, "ab": 2}
+    table = StringMap.build(mapping)
+
+    assert dict(table) == mapping
+    assert table.get("ab") == 2 and table.get("b") is None
+    assert "é" in table and "e" not in table
+    assert dict(StringMap.build({})) == {}
+    assert StringMap.build({}).get("x") is None
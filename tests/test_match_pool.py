@@ -0,0 +1,45 @@
+import asyncio
+
+from src.utils.index_store import save_index
+from src.utils.match_pool import MatchPool
+from src.utils.nlp_processor import NLPProcessor
+
+ROWS = [
+    ("reset password, forgot password", "Use the reset link on the login page."),
+    ("verify account, verification", "Verify in #verify with the bot."),
+]
+MESSAGES = ["how do I reset my password", "verify please", "zzz qqq", "reset password"]
+
+
+def test_worker_counts_reach_the_parent(nlp_settings, tmp_path, monkeypatch):
+    # Spawned workers read their settings from the environment.
+    monkeypatch.setenv("TOKENIZER_BACKEND", "regex")
+    processor = NLPProcessor(
+        source_spec=None, snapshot_dir=str(tmp_path), role="builder"
+    )
+    processor.index = processor.build_index(ROWS, 1, digest="rows")
+    save_index(processor.index, str(tmp_path), processor.snapshot_signature())
+    expected = processor.find_best_matches(MESSAGES)
+    # What matching the batch once in-process counts.
+    local = processor.counters()
+
+    async def run():
+        pool = MatchPool(workers=1, deadline=60, max_pending=100)
+        try:
+            first = await pool.match(processor, MESSAGES)
+            second = await pool.match(processor, MESSAGES)
+            await asyncio.sleep(0)
+            return first, second, pool.stats()
+        finally:
+            pool.close()
+
+    first, second, stats = asyncio.run(run())
+
+    assert first == second == expected
+    assert stats["batches"] == 2 and stats["fallbacks"] == 0
+    counters = processor.counters()
+    assert counters["gate_checked"] == 3 * local["gate_checked"]
+    assert counters["gate_rejected"] == 3 * local["gate_rejected"]
+    # The worker's replica misses its result cache once, then hits it.
+    assert counters["results_misses"] == 2 * local["results_misses"]
+    assert counters["results_hits"] == local["results_misses"]
@@ -0,0 +1,83 @@
+import numpy as np
+import pytest
+from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.metrics.pairwise import cosine_similarity
+
+from src.utils import nlp_processor
+from src.utils.nlp_processor import NLPProcessor
+
+ROWS = [
+    # Word order is lost in TF-IDF, so these two phrases always tie.
+    ("reset password, password reset", "Use the reset link on the login page."),
+    ("forgot password, reset password", "Ask a moderator to reset it."),
+    ("verify account, account verification", "Verify in #verify with the bot."),
+    ("server rules", "Read #rules before posting."),
+    ("server rules, posting rules", "Rules are pinned in every channel."),
+    ("password", "Passwords are never sent by DM."),
+]
+MESSAGES = [
+    "reset my password",
+    "password reset",
+    "how do I verify my account",
+    "what are the server rules",
+    "rules",
+    "password",
+    "completely unrelated words",
+]
+
+
+@pytest.fixture(params=["word", "hashed"])
+def processor(request, nlp_settings, monkeypatch):
+    monkeypatch.setattr(nlp_processor, "VECTORIZER_MODE", request.param)
+    processor = NLPProcessor(source_spec=None, snapshot_dir=None, role="builder")
+    processor.index = processor.build_index(ROWS, 1, digest="rows")
+    return processor
+
+
+def reference(similarities, k):
+    """Rank every phrase the message shares a term with, ties by lowest id."""
+    order = np.lexsort((np.arange(len(similarities)), -similarities))
+    return [
+        (int(phrase_id), similarities[phrase_id])
+        for phrase_id in order[:k]
+        if similarities[phrase_id] > 0
+    ]
+
+
+def assert_same_ranking(matches, expected):
+    assert [phrase_id for phrase_id, _ in matches] == [
+        phrase_id for phrase_id, _ in expected
+    ]
+    np.testing.assert_allclose(
+        [score for _, score in matches], [score for _, score in expected], rtol=1e-5
+    )
+
+
+def test_rows_have_ties_and_duplicate_phrases(processor):
+    nlp_index = processor.index
+    vector = nlp_index.vectorizer.transform(
+        [processor.preprocess_text("reset password")]
+    )
+    similarities = cosine_similarity(vector, nlp_index.tfidf_matrix)[0]
+
+    # Repeated phrases share one row; IDF still counts each occurrence.
+    assert len(set(nlp_index.phrases)) == len(nlp_index.phrases)
+    assert nlp_index.phrase_counts.max() > 1
+    if isinstance(nlp_index.vectorizer, TfidfVectorizer):
+        assert np.sum(np.isclose(similarities, similarities.max())) > 1
+
+
+@pytest.mark.parametrize("k", [1, 2, 3, 20])
+def test_top_k_matches_dense_cosine_similarity(processor, k):
+    nlp_index = processor.index
+    texts = [processor.preprocess_text(message) for message in MESSAGES]
+    vectors = nlp_index.vectorizer.transform(texts)
+    similarities = cosine_similarity(vectors, nlp_index.tfidf_matrix)
+
+    batch = nlp_index.top_k_batch(vectors, k)
+    for row, scores in enumerate(similarities):
+        expected = reference(scores, k)
+        assert_same_ranking(nlp_index.top_k(vectors[row], k), expected)
+        assert_same_ranking(batch[row], expected)
+        if expected:
+            assert expected[0][0] == np.argmax(scores)
@@ -0,0 +1,53 @@
+import asyncio
+import json
+
+import discord
+from discord.ext import commands
+
+from src.cogs import tasks
+
+
+def publish_status(bot_class, cluster_dir, monkeypatch, **options):
+    """Log a bot in to the fake API and return the cluster report it writes."""
+    monkeypatch.setattr(tasks, "CLUSTER_PROCESSES", 2)
+    monkeypatch.setattr(tasks, "CLUSTER_STATE_DIR", str(cluster_dir))
+    report = cluster_dir / "cluster-0.json"
+
+    async def run():
+        bot = bot_class(
+            command_prefix="!", intents=discord.Intents.default(), **options
+        )
+        async with bot:
+            await bot.add_cog(tasks.Tasks(bot))
+            login = asyncio.create_task(bot.start("token"))
+            # Shards identify five seconds apart, as on the real gateway.
+            for _ in range(300):
+                if report.exists() or login.done():
+                    break
+                await asyncio.sleep(0.05)
+            await bot.close()
+            await login
+
+    asyncio.run(asyncio.wait_for(run(), 30))
+    return json.loads(report.read_text())
+
+
+def test_unsharded_bot_publishes_cluster_status(fake_discord, tmp_path, monkeypatch):
+    report = publish_status(commands.Bot, tmp_path, monkeypatch)
+
+    assert report["guilds"] == 10
+    assert report["shards"] is None
+
+
+def test_sharded_bot_publishes_its_shards(fake_discord, tmp_path, monkeypatch):
+    report = publish_status(
+        commands.AutoShardedBot,
+        tmp_path,
+        monkeypatch,
+        shard_count=4,
+        shard_ids=[0, 1],
+    )
+
+    assert sorted(fake_discord.identified) == [0, 1]
+    assert report["shards"] == [0, 1]
+    assert report["guilds"] == 6
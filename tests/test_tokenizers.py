@@ -0,0 +1,152 @@
+import random
+
+import nltk
+import pytest
+from nltk.tokenize import NLTKWordTokenizer, word_tokenize
+from nltk.tokenize.punkt import PunktParameters, PunktSentenceTokenizer
+
+from src.utils.tokenizers import abbreviations, regex_tokenize
+
+MESSAGES = [
+    "How do I verify my account?",
+    "i can't find the #rules channel... help!!",
+    "Mr. Smith said hi. Then he left.",
+    "see e.g. the faq, i.e. the pinned post",
+    'he said "gonna be late" and left',
+    "it's 3.5 GB, not 1,000 MB",
+    "what's the server ip: 127.0.0.1:25565?",
+    "lemme know -- or don't",
+    "(wanna) [join] {the} <raid>?",
+    "rock'n'roll isn't dead, y'all",
+    "'tis the season. 'cause why not",
+    "Dr. Who vs. the Daleks at 5 p.m. tonight",
+    "the U.S. server is down. EU is fine.",
+    "ends with a period.",
+    "A. B. C. initials here",
+    "ping @mod and check https://example.com/a?b=c.",
+    "cannot gimme gotta more'n d'ye",
+    "multiple\nlines\n\nhere. ok?",
+    "emoji 😀 in the middle. 🙂",
+    "o'clock and ''double'' quotes",
+    "ask acme corp. about it",
+]
+
+FRAGMENTS = [
+    "hello",
+    "Verify",
+    "account",
+    "Mr.",
+    "Dr.",
+    "e.g.",
+    "i.e.",
+    "U.S.",
+    "etc.",
+    "3.5",
+    "1,000",
+    "v2.0",
+    "can't",
+    "don't",
+    "I'm",
+    "we'll",
+    "they're",
+    "you've",
+    "she'd",
+    "gonna",
+    "wanna",
+    "cannot",
+    "'tis",
+    "o'clock",
+    '"quoted"',
+    "'single'",
+    "...",
+    "--",
+    "(paren)",
+    "[x]",
+    "end.",
+    "x?",
+    "y!",
+    ":",
+    "a:b",
+    "a,b",
+    "1:30",
+    "@user",
+    "#chan",
+    "😀",
+    "A.",
+    "b.",
+    "--x",
+    "''",
+    "``",
+    "it's.",
+    "here.",
+    "NOW.",
+    "ok",
+    "Yes",
+    "no.",
+    "?!",
+    "x...y",
+]
+
+
+def generated_messages(count, seed=0):
+    rng = random.Random(seed)
+    for _ in range(count):
+        words = rng.choices(FRAGMENTS, k=rng.randint(1, 12))
+        yield "".join(word + rng.choice([" ", " ", " ", "  ", "\n"]) for word in words)
+
+
+def rule_reference(text):
+    """NLTK's word tokenization with Punkt given only our abbreviations.
+
+    Needs no downloaded model, so it checks the Treebank, clitic and
+    contraction rules wherever the tests run. It shares the abbreviation
+    list with ``regex_tokenize``, so only the ``word_tokenize`` tests below
+    check parity with the English model.
+    """
+    parameters = PunktParameters()
+    parameters.abbrev_types = set(abbreviations())
+    sentences = PunktSentenceTokenizer(parameters).tokenize(text)
+    tokenizer = NLTKWordTokenizer()
+    return [
+        token
+        for sentence in sentences
+        for token in tokenizer.tokenize(sentence)
+        if token.isalnum()
+    ]
+
+
+def has_punkt_model():
+    try:
+        nltk.data.find("tokenizers/punkt_tab/english/")
+    except LookupError:
+        return False
+    return True
+
+
+@pytest.mark.parametrize("text", MESSAGES)
+def test_matches_nltk_rules(text):
+    for variant in (text, text.lower()):
+        assert regex_tokenize(variant) == rule_reference(variant)
+
+
+def test_matches_nltk_rules_on_generated_messages():
+    for text in generated_messages(5000):
+        for variant in (text, text.lower()):
+            assert regex_tokenize(variant) == rule_reference(variant), variant
+
+
+@pytest.mark.skipif(not has_punkt_model(), reason="punkt_tab is not installed")
+@pytest.mark.parametrize("text", MESSAGES)
+def test_matches_word_tokenize(text):
+    # The bot lowercases messages before tokenizing them.
+    text = text.lower()
+    expected = [token for token in word_tokenize(text) if token.isalnum()]
+    assert regex_tokenize(text) == expected
+
+
+@pytest.mark.skipif(not has_punkt_model(), reason="punkt_tab is not installed")
+def test_matches_word_tokenize_on_generated_messages():
+    for text in generated_messages(5000):
+        text = text.lower()
+        expected = [token for token in word_tokenize(text) if token.isalnum()]
+        assert regex_tokenize(text) == expected, text